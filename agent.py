@@ -10,7 +10,7 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 from src.pipelines.business import GestorStockPipeline
-from src.pipelines.ml import MLPipeline, PredictorDemandaPipeline
+from src.pipelines.ml import MLPipeline, PredictorDemandaPipeline, RegistroModelos
 import pandas as pd
 
 
@@ -24,6 +24,8 @@ class PYMESMLAgent:
         "eoq_produccion": "EOQ de producción",
         "abc": "Clasificación ABC",
         "predecir": "Entrenar modelo ML",
+        "comparar": "Comparar todos los modelos ML",
+        "modelos": "Listar y cargar modelos guardados",
         "generar": "Generar datos sintéticos",
         "ayuda": "Mostrar ayuda",
         "salir": "Terminar",
@@ -31,7 +33,9 @@ class PYMESMLAgent:
 
     def __init__(self):
         self.modelo_entrenado = None
+        self.pipeline = None
         self.demanda_data = None
+        self.registro = RegistroModelos()
 
     def saludar(self):
         print("""
@@ -153,13 +157,16 @@ class PYMESMLAgent:
             return
 
         try:
-            df = pd.read_csv(archivo)
-            print(f"  Columnas disponibles: {list(df.columns)}")
+            columnas = list(pd.read_csv(archivo, nrows=0).columns)
+            print(f"  Columnas disponibles: {columnas}")
             col = input("  Columna de valor: ")
+            clave = (
+                input("  Columna clave del ítem (opcional, suma por clave): ") or None
+            )
             a = float(input("  Umbral A% (default 80): ") or 80) / 100
             b = float(input("  Umbral B% (default 95): ") or 95) / 100
 
-            res, stats = GestorStockPipeline.abc(df, col, a, b)
+            res, stats = GestorStockPipeline.abc_archivo(archivo, col, clave, a, b)
 
             print(f"""
 ┌─────────── Clasificación ABC ───────────┐
@@ -192,7 +199,7 @@ class PYMESMLAgent:
             return
 
         try:
-            print("  Modelos: lineal, ridge, rf, gb")
+            print(f"  Modelos: {', '.join(MLPipeline.MODELOS)}")
             m = input("  Modelo: ") or "lineal"
             feats = input("  Features (separados por coma): ").split(",") or [
                 "dia",
@@ -202,11 +209,55 @@ class PYMESMLAgent:
             X = self.demanda_data[feats]
             y = self.demanda_data["demanda"]
 
-            self.modelo_entrenado = MLPipeline(m.strip()).entrenar(X, y)
+            self.pipeline = MLPipeline(m.strip())
+            self.modelo_entrenado = self.pipeline.entrenar(X, y)
             print(f"\n✅ Modelo entrenado")
             print(f"   R²: {self.modelo_entrenado.r2:.4f}")
             print(f"   RMSE: {self.modelo_entrenado.rmse:.2f}")
             print(f"   MAE: {self.modelo_entrenado.mae:.2f}")
+
+            nombre = input("  Guardar como (Enter para omitir): ").strip()
+            if nombre:
+                v = self.registro.registrar(nombre, self.pipeline)
+                print(f"   Guardado {nombre} v{v}")
+        except Exception as e:
+            print(f"❌ Error: {e}")
+
+    def run_comparar(self):
+        print("\n🏁 Comparar Modelos")
+        if self.demanda_data is None:
+            print("❌ Primero genera datos con /generar")
+            return
+
+        try:
+            feats = input("  Features (separados por coma): ").strip() or "dia,mes"
+            X = self.demanda_data[[f.strip() for f in feats.split(",")]]
+            y = self.demanda_data["demanda"]
+
+            tabla, pipes = MLPipeline.comparar(X, y)
+            print(tabla.round(4).to_string())
+            self.pipeline = pipes[tabla.index[0]]
+            self.modelo_entrenado = self.pipeline.metricas
+            print(f"\n✅ Mejor modelo: {tabla.index[0]}")
+        except Exception as e:
+            print(f"❌ Error: {e}")
+
+    def run_modelos(self):
+        print("\n🗂️  Modelos guardados")
+        try:
+            guardados = self.registro.listar()
+            if guardados.empty:
+                print("  No hay modelos guardados")
+                return
+            print(guardados.to_string(index=False))
+
+            nombre = input("\n  Cargar nombre (Enter para omitir): ").strip()
+            if nombre:
+                v = input("  Versión (Enter = última): ").strip()
+                self.pipeline = self.registro.cargar(nombre, int(v) if v else None)
+                self.modelo_entrenado = self.pipeline.metricas
+                print(f"✅ Cargado {nombre} ({self.pipeline.tipo})")
+                print(f"   Features: {', '.join(self.pipeline.features)}")
         except Exception as e:
             print(f"❌ Error: {e}")
 
@@ -238,6 +289,10 @@ class PYMESMLAgent:
                     self.run_generar_datos()
                 elif cmd == "/predecir":
                     self.run_predecir()
+                elif cmd == "/comparar":
+                    self.run_comparar()
+                elif cmd == "/modelos":
+                    self.run_modelos()
                 elif cmd:
                     print(f"  Comando '{cmd}' no reconocido. Usa /ayuda")
             except KeyboardInterrupt:
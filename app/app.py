@@ -14,10 +14,19 @@ import os
 
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 from src.pipelines.business import GestorStockPipeline
-from src.pipelines.ml import MLPipeline, PredictorDemandaPipeline
+from src.pipelines.sensibilidad import SensibilidadPipeline
+from src.pipelines.ml import MLPipeline, PredictorDemandaPipeline, RegistroModelos
 
 st.set_page_config(page_title="PYMESML", layout="wide")
 
+registro = RegistroModelos()
+
+
+@st.cache_resource
+def cargar_modelo(nombre: str, version: int) -> MLPipeline:
+    return registro.cargar(nombre, version)
+
+
 st.markdown(
     """
 <div style="border: 2px solid #00FF41; border-radius: 15px; padding: 15px;">
@@ -59,17 +68,47 @@ with tabs[1]:
             C3 = st.number_input("Costo ordenamiento ($)", 0.01, 10000.0, 10.0, 0.1)
             C4 = st.number_input("Costo unitario ($)", 0.0, 1000.0, 5.0, 0.1)
         lead = st.number_input("Lead time (días)", 0.0, 365.0, 5.0, 1.0)
+        var = st.slider("Variación de D y C1 (±%)", 5, 50, 20)
 
         if st.button("Calcular"):
             r = GestorStockPipeline.eoq_clasico(D, C1, C3, C4, lead)
-            st.success("Resultados EOQ Clásico")
-            m1, m2, m3 = st.columns(3)
-            m1.metric("Q* Óptimo", f"{r.Q_optimo:.1f} unidades")
-            m2.metric("Costo Total", f"${r.costo_total:.2f}")
-            m3.metric("Pedidos/Año", f"{r.numero_pedidos:.1f}")
-            m1.metric("Ciclo", f"{r.ciclo_dias:.1f} días")
-            m2.metric("Punto Reorden", f"{r.punto_reorden:.1f}")
-            m3.metric("Costo Mantenimiento", f"${r.costo_mantenimiento:.2f}")
+            st.success(
+                f"Q* = {r.Q_optimo:.1f} unidades · Costo Total ${r.costo_total:.2f}"
+                f" · Punto Reorden {r.punto_reorden:.1f}"
+            )
+            delta = np.linspace(-var, var, 41)
+            sup = SensibilidadPipeline.evaluar(
+                "clasico",
+                {"D": D * (1 + delta / 100), "C1": C1 * (1 + delta / 100)},
+                C3=C3,
+                C4=C4,
+                lead_time=lead,
+            )
+            etiquetas = [f"{x:+.0f}%" for x in delta]
+            s1, s2 = st.tabs(["Costo Total", "Q* Óptimo"])
+            for tab, campo in ((s1, "costo_total"), (s2, "Q_optimo")):
+                with tab:
+                    fig = px.imshow(
+                        sup[campo],
+                        x=etiquetas,
+                        y=etiquetas,
+                        origin="lower",
+                        aspect="auto",
+                        labels={"x": "Δ C1", "y": "Δ Demanda", "color": campo},
+                    )
+                    st.plotly_chart(fig)
+            st.dataframe(
+                pd.DataFrame(
+                    {
+                        "Elasticidad costo": {
+                            k: v[20, 20] for k, v in sup.elasticidad_costo.items()
+                        },
+                        "Elasticidad Q*": {
+                            k: v[20, 20] for k, v in sup.elasticidad_Q.items()
+                        },
+                    }
+                ).round(3)
+            )
 
     elif modelo == "EOQ Faltantes":
         c1, c2 = st.columns(2)
@@ -138,12 +177,16 @@ with tabs[1]:
     elif modelo == "ABC":
         file = st.file_uploader("CSV productos", type=["csv"])
         if file:
-            df = pd.read_csv(file)
-            col = st.selectbox("Columna valor", df.columns)
+            columnas = list(pd.read_csv(file, nrows=0).columns)
+            file.seek(0)
+            col = st.selectbox("Columna valor", columnas)
+            clave = st.selectbox(
+                "Columna clave (opcional, suma las filas por clave)", [None] + columnas
+            )
             a = st.slider("Umbral A (%)", 50, 95, 80) / 100
             b = st.slider("Umbral B (%)", 75, 99, 95) / 100
             if st.button("Clasificar"):
-                res, stats = GestorStockPipeline.abc(df, col, a, b)
+                res, stats = GestorStockPipeline.abc_archivo(file, col, clave, a, b)
                 st.session_state["abc"] = res
                 st.session_state["abc_stats"] = stats
                 st.success("Completado")
@@ -188,26 +231,57 @@ with tabs[2]:
     with ptabs[1]:
         if "df_dem" in st.session_state:
             st.dataframe(st.session_state["df_dem"].head())
-            m = st.selectbox("Modelo", ["lineal", "ridge", "rf", "gb"])
+            m = st.selectbox("Modelo", list(MLPipeline.MODELOS))
             feats = st.multiselect(
                 "Features", ["dia", "mes", "trimestre"], default=["dia", "mes"]
             )
+            val = st.selectbox("Validación", ["aleatoria", "expanding", "rolling"])
             if st.button("Entrenar"):
                 X = st.session_state["df_dem"][feats]
                 y = st.session_state["df_dem"]["demanda"]
-                pipe = MLPipeline(m).entrenar(X, y)
+                pipe = MLPipeline(m)
+                met = pipe.entrenar(
+                    X, y, validacion=None if val == "aleatoria" else val
+                )
                 st.session_state["pipe"] = pipe
                 imp = pipe.importancia()
-                st.success(f"R²: {imp.pop('r2', 0):.4f}")
+                st.success(f"R²: {met.r2:.4f}")
+                if pipe.backtest is not None:
+                    st.dataframe(pipe.backtest.round(4))
                 st.dataframe(
                     pd.DataFrame(
                         imp.items(), columns=["Feature", "Importancia"]
                     ).sort_values("Importancia", ascending=False)
                 )
+            if st.button("Comparar todos"):
+                X = st.session_state["df_dem"][feats]
+                y = st.session_state["df_dem"]["demanda"]
+                tabla, pipes = MLPipeline.comparar(X, y)
+                st.session_state["pipe"] = pipes[tabla.index[0]]
+                st.success(f"Mejor modelo: {tabla.index[0]}")
+                st.dataframe(tabla.round(4))
+            if "pipe" in st.session_state:
+                nombre = st.text_input("Nombre en el registro", "demanda")
+                if st.button("Guardar modelo"):
+                    v = registro.registrar(nombre, st.session_state["pipe"])
+                    st.success(f"Guardado {nombre} v{v}")
         else:
             st.info("Genera datos primero")
 
     with ptabs[2]:
+        guardados = registro.listar()
+        if len(guardados):
+            with st.expander("Modelos guardados"):
+                st.dataframe(guardados)
+                fila = st.selectbox(
+                    "Versión",
+                    guardados.index,
+                    format_func=lambda i: f"{guardados.nombre[i]} v{guardados.version[i]}",
+                )
+                if st.button("Cargar"):
+                    st.session_state["pipe"] = cargar_modelo(
+                        guardados.nombre[fila], int(guardados.version[fila])
+                    )
         if "pipe" in st.session_state:
             p = st.session_state["pipe"]
             vals = [st.number_input(f, 0.0, 10000.0, 100.0) for f in p.features]
@@ -15,6 +15,8 @@ import matplotlib.pyplot as plt
 import plotly.express as px
 from scipy import stats
 
+from src.pipelines.ml import RegistroModelos
+
 
 class EDAAgent:
     """Agente conversacional para EDA"""
@@ -56,6 +58,7 @@ class EDAAgent:
   /scatter       → Gráfico de dispersión
   /categorico    → Análisis de variables categóricas
   /resumen      → Resumen completo del EDA
+  /predecir     → Predecir con un modelo guardado
   /ayuda        → Mostrar ayuda
   /salir        → Terminar
         """)
@@ -398,6 +401,29 @@ class EDAAgent:
 
         print("\n✅ Resumen EDA completado")
 
+    def predecir_modelo(self):
+        if self.df is None:
+            print("❌ No hay dataset")
+            return
+
+        registro = RegistroModelos()
+        guardados = registro.listar()
+        if guardados.empty:
+            print("❌ No hay modelos guardados")
+            return
+        print(guardados.to_string(index=False))
+
+        try:
+            nombre = input("\n  Modelo: ").strip()
+            v = input("  Versión (Enter = última): ").strip()
+            pipe = registro.cargar(nombre, int(v) if v else None)
+            col = f"pred_{nombre}"
+            self.df[col] = pipe.predecir_lote(self.df)
+            print(f"\n✅ Columna '{col}' agregada")
+            print(self.df[col].describe().round(2))
+        except Exception as e:
+            print(f"❌ Error: {e}")
+
     def ejecutar(self):
         """Loop principal del agente"""
         self.saludar()
@@ -442,6 +468,8 @@ class EDAAgent:
                     self.analisis_categorico()
                 elif cmd == "/resumen":
                     self.resumen_eda()
+                elif cmd == "/predecir":
+                    self.predecir_modelo()
                 elif cmd:
                     print(f"  Comando '{cmd}' no reconocido. Usa /ayuda")
 
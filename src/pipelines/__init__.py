@@ -4,13 +4,41 @@ PYMESML Pipelines
 Modelos de negocio y Machine Learning como pipelines modulares.
 """
 
-from src.pipelines.business import GestorStockPipeline, EOQResult
-from src.pipelines.ml import MLPipeline, PredictorDemandaPipeline, Metricas
+from src.pipelines.business import GestorStockPipeline, EOQResult, EOQLote
+from src.pipelines.sensibilidad import SensibilidadPipeline, Superficie
+from src.pipelines.estocastico import StockSeguridadPipeline
+from src.pipelines.simulacion import (
+    SimuladorInventarioPipeline,
+    OptimizadorPoliticasPipeline,
+)
+from src.pipelines.reposicion import ReposicionConjuntaPipeline
+from src.pipelines.portafolio import PortafolioPipeline
+from src.pipelines.paralelo import ParaleloPipeline
+from src.pipelines.ml import (
+    MLPipeline,
+    PredictorDemandaPipeline,
+    Metricas,
+    RegistroModelos,
+)
+from src.pipelines.features import FeaturesPipeline
+from src.pipelines.multiserie import MultiSeriePipeline
 
 __all__ = [
     "GestorStockPipeline",
     "EOQResult",
+    "EOQLote",
+    "SensibilidadPipeline",
+    "Superficie",
+    "StockSeguridadPipeline",
+    "SimuladorInventarioPipeline",
+    "OptimizadorPoliticasPipeline",
+    "ReposicionConjuntaPipeline",
+    "PortafolioPipeline",
+    "ParaleloPipeline",
     "MLPipeline",
     "PredictorDemandaPipeline",
     "Metricas",
+    "RegistroModelos",
+    "FeaturesPipeline",
+    "MultiSeriePipeline",
 ]
@@ -4,13 +4,27 @@ Business Pipeline - Modelos EOQ para Gestión de Stock
 Pipeline de negocio para optimización de inventarios.
 """
 
+import warnings
 from dataclasses import dataclass
-from typing import Dict, Tuple
+from typing import Dict, List, Optional, Tuple, Union
 import pandas as pd
 import numpy as np
 
+ArrayLike = Union[float, np.ndarray, pd.Series]
 
-@dataclass
+# Códigos de error por fila en los cálculos en lote (bits combinables)
+ERRORES_LOTE = {
+    1: "D debe ser positiva",
+    2: "C1 debe ser positivo",
+    4: "C3 debe ser positivo",
+    8: "C2 debe ser positivo",
+    16: "p debe ser mayor que d",
+    32: "Sin resultado",
+    64: "i debe ser positiva",
+}
+
+
+@dataclass(slots=True)
 class EOQResult:
     """Resultado del cálculo EOQ"""
 
@@ -23,6 +37,161 @@ class EOQResult:
     punto_reorden: float = 0.0
 
 
+class EOQFila:
+    """Vista de una fila de EOQLote (sin copiar los valores)"""
+
+    __slots__ = ("_lote", "_i")
+
+    def __init__(self, lote: "EOQLote", i: int):
+        self._lote = lote
+        self._i = i
+
+    def __getattr__(self, campo: str) -> float:
+        # Sin esto copy/pickle recursan: piden atributos antes de _lote/_i
+        if campo.startswith("_"):
+            raise AttributeError(campo)
+        try:
+            return float(self._lote[campo][self._i])
+        except KeyError:
+            raise AttributeError(campo) from None
+
+    def __getitem__(self, campo: str) -> float:
+        return float(self._lote[campo][self._i])
+
+    def keys(self) -> Tuple[str, ...]:
+        return self._lote.campos
+
+    def to_dict(self) -> Dict[str, float]:
+        return {c: self[c] for c in self.keys()}
+
+    def __repr__(self) -> str:
+        return f"EOQFila({self._lote.modelo}, {self.to_dict()})"
+
+
+class EOQLote:
+    """Resultado columnar de los modelos EOQ.
+
+    Guarda un bloque float64 en orden Fortran, de modo que cada campo es
+    un array contiguo y ``to_frame`` no copia datos.
+    """
+
+    CAMPOS = {
+        "clasico": (
+            "Q_optimo",
+            "costo_total",
+            "costo_ordenamiento",
+            "costo_mantenimiento",
+            "numero_pedidos",
+            "ciclo_dias",
+            "punto_reorden",
+        ),
+        "faltantes": (
+            "Q_optimo",
+            "S_max",
+            "I_maximo",
+            "costo_total",
+            "costo_ordenamiento",
+            "costo_mantenimiento",
+            "costo_faltantes",
+            "numero_pedidos",
+            "ciclo_dias",
+            "t1_dias",
+            "t2_dias",
+        ),
+        "descuentos": (
+            "Q_optimo",
+            "precio_unitario",
+            "costo_total",
+            "costo_compra",
+            "costo_ordenamiento",
+            "costo_mantenimiento",
+            "tramo",
+        ),
+        "produccion": (
+            "Q_optimo",
+            "I_maximo",
+            "costo_total",
+            "costo_ordenamiento",
+            "costo_mantenimiento",
+            "numero_pedidos",
+            "ciclo_dias",
+            "tiempo_produccion_dias",
+            "factor_produccion",
+        ),
+    }
+
+    __slots__ = ("modelo", "campos", "datos", "valido", "codigo", "indice", "_pos")
+
+    def __init__(self, modelo: str, n: int, indice: Optional[pd.Index] = None):
+        if modelo not in self.CAMPOS:
+            raise ValueError(f"Modelo '{modelo}' no disponible")
+        self.modelo = modelo
+        self.campos = self.CAMPOS[modelo]
+        self._pos = {c: j for j, c in enumerate(self.campos)}
+        self.datos = np.full((n, len(self.campos)), np.nan, order="F")
+        self.valido = np.ones(n, dtype=bool)
+        self.codigo = np.zeros(n, dtype=np.uint8)
+        self.indice = indice
+
+    def __len__(self) -> int:
+        return self.datos.shape[0]
+
+    def __getitem__(self, campo: str) -> np.ndarray:
+        return self.datos[:, self._pos[campo]]
+
+    def __getattr__(self, campo: str) -> np.ndarray:
+        # Sin esto copy/pickle recursan: piden atributos antes de _pos
+        if campo.startswith("_"):
+            raise AttributeError(campo)
+        try:
+            return self.datos[:, self._pos[campo]]
+        except KeyError:
+            raise AttributeError(campo) from None
+
+    def marcar(self, codigo: np.ndarray) -> None:
+        """Registra los códigos de error por fila (0 = válida)"""
+        self.codigo[:] = codigo
+        np.equal(self.codigo, 0, out=self.valido)
+
+    def errores(self, i: int) -> list:
+        """Mensajes de error de una fila"""
+        return [m for bit, m in ERRORES_LOTE.items() if self.codigo[i] & bit]
+
+    def asignar(self, campo: str, valores: ArrayLike) -> None:
+        """Escribe un campo; las filas inválidas quedan en NaN"""
+        np.copyto(self[campo], valores, where=self.valido)
+
+    def fila(self, i: int) -> EOQFila:
+        return EOQFila(self, i)
+
+    def to_frame(self) -> pd.DataFrame:
+        """DataFrame que comparte memoria con el bloque columnar"""
+        df = pd.DataFrame(
+            self.datos, columns=list(self.campos), index=self.indice, copy=False
+        )
+        df["valido"] = self.valido
+        df["codigo"] = self.codigo
+        return df
+
+    @classmethod
+    def desde(cls, modelo: str, resultados: list) -> "EOQLote":
+        """Construye el lote a partir de resultados escalares (EOQResult o dict)"""
+        lote = cls(modelo, len(resultados))
+        for i, r in enumerate(resultados):
+            if not r:
+                lote.codigo[i] = 32
+                lote.valido[i] = False
+                continue
+            for j, c in enumerate(lote.campos):
+                lote.datos[i, j] = (
+                    r.get(c, np.nan) if isinstance(r, dict) else getattr(r, c)
+                )
+        return lote
+
+    def __repr__(self) -> str:
+        return f"EOQLote(modelo={self.modelo!r}, n={len(self)})"
+
+
 class GestorStockPipeline:
     """Pipeline de gestión de stock con modelos EOQ"""
 
@@ -35,6 +204,47 @@ class GestorStockPipeline:
         if C3 <= 0:
             raise ValueError("C3 debe ser positivo")
 
+    @staticmethod
+    def _validar_lote(
+        D: np.ndarray,
+        C1: Optional[np.ndarray],
+        C3: np.ndarray,
+        C2: Optional[np.ndarray] = None,
+        d: Optional[np.ndarray] = None,
+        p: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """Códigos de error por fila (ver ERRORES_LOTE); NaN cuenta como inválido"""
+        codigo = np.zeros(D.shape, dtype=np.uint8)
+        codigo |= np.where(D > 0, 0, 1).astype(np.uint8)
+        if C1 is not None:
+            codigo |= np.where(C1 > 0, 0, 2).astype(np.uint8)
+        codigo |= np.where(C3 > 0, 0, 4).astype(np.uint8)
+        if C2 is not None:
+            codigo |= np.where(C2 > 0, 0, 8).astype(np.uint8)
+        if d is not None and p is not None:
+            codigo |= np.where(p > d, 0, 16).astype(np.uint8)
+        return codigo
+
+    @staticmethod
+    def _broadcast(*valores: ArrayLike) -> list:
+        """Convierte a float64 1-D con broadcasting común"""
+        return np.broadcast_arrays(
+            *(np.atleast_1d(np.asarray(v, dtype=np.float64)) for v in valores)
+        )
+
+    @staticmethod
+    def _columnas(datos: pd.DataFrame, columnas: Dict[str, Optional[float]]):
+        """Extrae columnas como float64; usa el valor por defecto si faltan"""
+        salida = []
+        for nombre, defecto in columnas.items():
+            if nombre in datos.columns:
+                salida.append(datos[nombre].to_numpy(dtype=np.float64))
+            elif defecto is None:
+                raise ValueError(f"Falta la columna '{nombre}'")
+            else:
+                salida.append(defecto)
+        return salida
+
     @staticmethod
     def eoq_clasico(
         D: float,
@@ -63,6 +273,175 @@ class GestorStockPipeline:
             punto_reorden=(D / dias) * lead_time,
         )
 
+    @staticmethod
+    def eoq_clasico_lote(
+        D: Union[ArrayLike, pd.DataFrame],
+        C1: Optional[ArrayLike] = None,
+        C3: Optional[ArrayLike] = None,
+        C4: ArrayLike = 0,
+        lead_time: ArrayLike = 0,
+        dias: int = 365,
+    ) -> "EOQLote":
+        """EOQ Clásico vectorizado sobre un catálogo completo.
+
+        Acepta arrays (con broadcasting) o un DataFrame con columnas
+        D, C1, C3 y opcionalmente C4 y lead_time. Las filas inválidas no
+        lanzan error: quedan en NaN, con ``valido=False`` y su ``codigo``.
+        """
+        indice = None
+        if isinstance(D, pd.DataFrame):
+            indice = D.index
+            D, C1, C3, C4, lead_time = GestorStockPipeline._columnas(
+                D, {"D": None, "C1": None, "C3": None, "C4": 0, "lead_time": 0}
+            )
+        D, C1, C3, C4, lead_time = GestorStockPipeline._broadcast(
+            D, C1, C3, C4, lead_time
+        )
+        codigo = GestorStockPipeline._validar_lote(D, C1, C3)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            Q = np.sqrt(2 * D * C3 / C1)
+            pedidos = D / Q
+            costo_orden = pedidos * C3
+            costo_mant = (Q / 2) * C1
+            total = D * C4 + costo_orden + costo_mant
+            ciclo = dias / pedidos
+        reorden = (D / dias) * lead_time
+
+        lote = EOQLote("clasico", len(D), indice)
+        lote.marcar(codigo)
+        lote.asignar("Q_optimo", Q)
+        lote.asignar("costo_total", total)
+        lote.asignar("costo_ordenamiento", costo_orden)
+        lote.asignar("costo_mantenimiento", costo_mant)
+        lote.asignar("numero_pedidos", pedidos)
+        lote.asignar("ciclo_dias", ciclo)
+        lote.asignar("punto_reorden", reorden)
+        return lote
+
+    @staticmethod
+    def eoq_restringido_lote(
+        D: ArrayLike,
+        C1: ArrayLike,
+        C3: ArrayLike,
+        espacio: Optional[ArrayLike] = None,
+        capacidad: Optional[float] = None,
+        precio: Optional[ArrayLike] = None,
+        presupuesto: Optional[float] = None,
+        lead_time: ArrayLike = 0,
+        dias: int = 365,
+        tol: float = 1e-9,
+        max_iter: int = 200,
+    ) -> Tuple[EOQLote, Dict[str, float]]:
+        """EOQ multi-ítem con capacidad de bodega y/o presupuesto compartidos
+
+        Restricciones: Σ espacio·Q <= capacidad y Σ precio·Q <= presupuesto.
+        Se resuelve la relajación lagrangiana, Q(λ) = √(2DC₃/(C₁ + 2Σλw)),
+        con Newton proyectado sobre ambos multiplicadores a la vez; cada
+        evaluación es una pasada NumPy sobre todos los ítems. Devuelve el
+        lote clásico con los Q restringidos y los precios sombra ``lambda_*``
+        junto con el uso de cada restricción, las iteraciones y
+        ``convergio`` (si es False además se emite un RuntimeWarning).
+        """
+        D, C1, C3, lead_time = GestorStockPipeline._broadcast(D, C1, C3, lead_time)
+        codigo = GestorStockPipeline._validar_lote(D, C1, C3)
+        valido = codigo == 0
+        base = np.where(valido, 2 * D * C3, 0.0)
+        C1v = np.where(valido, C1, 1.0)
+
+        restricciones = {}
+        for nombre, limite in (("capacidad", capacidad), ("presupuesto", presupuesto)):
+            if limite is not None and limite <= 0:
+                raise ValueError(f"{nombre} debe ser positivo")
+        if capacidad is not None:
+            if espacio is None:
+                raise ValueError("La capacidad requiere el espacio por unidad")
+            restricciones["espacio"] = (np.broadcast_to(espacio, D.shape), capacidad)
+        if presupuesto is not None:
+            if precio is None:
+                raise ValueError("El presupuesto requiere el precio por unidad")
+            restricciones["presupuesto"] = (
+                np.broadcast_to(precio, D.shape),
+                presupuesto,
+            )
+        nombres = list(restricciones)
+        W = np.array([restricciones[k][0] for k in nombres], dtype=np.float64)
+        W = W.reshape(len(nombres), len(D))
+        caps = np.array([restricciones[k][1] for k in nombres], dtype=np.float64)
+
+        def lotes(lam: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+            costo = C1v + 2 * (lam @ W)
+            return np.sqrt(base / costo), costo
+
+        def dual(lam: np.ndarray) -> float:
+            # Con Q(λ) óptimo, orden + mantenimiento = √(2DC₃·costo)
+            return float(np.sqrt(base * lotes(lam)[1]).sum() - lam @ caps)
+
+        # Newton proyectado sobre el dual cóncavo: ∇ = uso - límite y
+        # H = -Σ w wᵀ Q / costo; ambos multiplicadores se mueven juntos
+        lam = np.zeros(len(nombres))
+        iteraciones, convergio = 0, True
+        if nombres:
+            convergio = False
+            valor = dual(lam)
+            while iteraciones < max_iter:
+                Q, costo = lotes(lam)
+                grad = W @ Q - caps
+                # En la cota λ = 0 con la restricción holgada no hay que moverse
+                libres = ~((lam <= 0) & (grad <= 0))
+                if np.all(np.abs(grad[libres]) <= tol * caps[libres]):
+                    convergio = True
+                    break
+                Wl = W[libres]
+                H = -(Wl * (Q / costo)) @ Wl.T
+                paso = np.zeros_like(lam)
+                paso[libres] = np.linalg.lstsq(H, -grad[libres], rcond=None)[0]
+                t = 1.0
+                for _ in range(60):
+                    nuevo = np.maximum(lam + t * paso, 0.0)
+                    nuevo_valor = dual(nuevo)
+                    if nuevo_valor >= valor:
+                        break
+                    t /= 2
+                iteraciones += 1
+                if np.array_equal(nuevo, lam):
+                    # Sin avance posible en precisión de máquina
+                    convergio = bool(
+                        np.all(np.abs(grad[libres]) <= 1e-6 * caps[libres])
+                    )
+                    break
+                lam, valor = nuevo, nuevo_valor
+        if not convergio:
+            warnings.warn(
+                "eoq_restringido_lote no convergió: revise max_iter o tol",
+                RuntimeWarning,
+                stacklevel=2,
+            )
+        lambdas = dict(zip(nombres, lam.tolist()))
+
+        Q = lotes(lam)[0]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pedidos = D / Q
+            costo_orden = pedidos * C3
+            costo_mant = (Q / 2) * C1
+            ciclo = dias / pedidos
+
+        lote = EOQLote("clasico", len(D))
+        lote.marcar(codigo)
+        lote.asignar("Q_optimo", Q)
+        lote.asignar("costo_total", costo_orden + costo_mant)
+        lote.asignar("costo_ordenamiento", costo_orden)
+        lote.asignar("costo_mantenimiento", costo_mant)
+        lote.asignar("numero_pedidos", pedidos)
+        lote.asignar("ciclo_dias", ciclo)
+        lote.asignar("punto_reorden", (D / dias) * lead_time)
+
+        info = {"iteraciones": iteraciones, "convergio": convergio}
+        for k, (w, _) in restricciones.items():
+            info[f"lambda_{k}"] = lambdas[k]
+            info[f"uso_{k}"] = float(np.dot(w, Q))
+        return lote, info
+
     @staticmethod
     def eoq_faltantes(
         D: float, C1: float, C2: float, C3: float, C4: float = 0, dias: int = 365
@@ -95,6 +474,51 @@ class GestorStockPipeline:
             "t2_dias": (S / D) * dias,
         }
 
+    @staticmethod
+    def eoq_faltantes_lote(
+        D: Union[ArrayLike, pd.DataFrame],
+        C1: Optional[ArrayLike] = None,
+        C2: Optional[ArrayLike] = None,
+        C3: Optional[ArrayLike] = None,
+        C4: ArrayLike = 0,
+        dias: int = 365,
+    ) -> EOQLote:
+        """EOQ con Faltantes vectorizado (DataFrame con D, C1, C2, C3 y C4)"""
+        indice = None
+        if isinstance(D, pd.DataFrame):
+            indice = D.index
+            D, C1, C2, C3, C4 = GestorStockPipeline._columnas(
+                D, {"D": None, "C1": None, "C2": None, "C3": None, "C4": 0}
+            )
+        D, C1, C2, C3, C4 = GestorStockPipeline._broadcast(D, C1, C2, C3, C4)
+        codigo = GestorStockPipeline._validar_lote(D, C1, C3, C2=C2)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            Q = np.sqrt(2 * D * C3 / C1 * (C1 + C2) / C2)
+            S = Q * (C1 / (C1 + C2))
+            Imax = Q - S
+            pedidos = D / Q
+            costo_orden = pedidos * C3
+            costo_mant = C1 * Imax**2 / (2 * Q)
+            costo_falt = C2 * S**2 / (2 * Q)
+            ciclo = dias / pedidos
+            dias_por_unidad = dias / D
+
+        lote = EOQLote("faltantes", len(D), indice)
+        lote.marcar(codigo)
+        lote.asignar("Q_optimo", Q)
+        lote.asignar("S_max", S)
+        lote.asignar("I_maximo", Imax)
+        lote.asignar("costo_total", D * C4 + costo_orden + costo_mant + costo_falt)
+        lote.asignar("costo_ordenamiento", costo_orden)
+        lote.asignar("costo_mantenimiento", costo_mant)
+        lote.asignar("costo_faltantes", costo_falt)
+        lote.asignar("numero_pedidos", pedidos)
+        lote.asignar("ciclo_dias", ciclo)
+        lote.asignar("t1_dias", Imax * dias_por_unidad)
+        lote.asignar("t2_dias", S * dias_por_unidad)
+        return lote
+
     @staticmethod
     def eoq_descuentos(D: float, C3: float, i: float, rangos: list) -> Dict:
         """EOQ con Descuentos por Volumen"""
@@ -103,11 +527,7 @@ class GestorStockPipeline:
         for r in rangos:
             C1 = i * r["precio"]
             Q = np.sqrt(2 * D * C3 / C1)
-            Q = (
-                max(Q, r["min"])
-                if Q < r["min"]
-                else (r["max"] if "max" in r and Q > r["max"] else Q)
-            )
+            Q = min(max(Q, r.get("min", 0)), r.get("max", float("inf")))
 
             total = D * r["precio"] + (D / Q) * C3 + (Q / 2) * C1
 
@@ -127,6 +547,106 @@ class GestorStockPipeline:
 
         return mejor if mejor else {}
 
+    @staticmethod
+    def _tramos_csr(
+        precios: np.ndarray,
+        minimos: Optional[np.ndarray] = None,
+        maximos: Optional[np.ndarray] = None,
+        offsets: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Normaliza los tramos de descuento a CSR: (precios, mínimos, máximos, offsets)"""
+        precios = np.asarray(precios, dtype=np.float64)
+        minimos = (
+            np.zeros_like(precios)
+            if minimos is None
+            else np.nan_to_num(np.asarray(minimos, dtype=np.float64), nan=0.0)
+        )
+        maximos = (
+            np.full_like(precios, np.inf)
+            if maximos is None
+            else np.nan_to_num(np.asarray(maximos, dtype=np.float64), nan=np.inf)
+        )
+        if offsets is None:
+            if precios.ndim != 2:
+                raise ValueError("Sin offsets los tramos deben ser una matriz (n, k)")
+            presente = ~np.isnan(precios)
+            offsets = np.concatenate(([0], np.cumsum(presente.sum(axis=1))))
+            precios, minimos, maximos = (
+                precios[presente],
+                minimos[presente],
+                maximos[presente],
+            )
+        offsets = np.asarray(offsets, dtype=np.int64)
+        return precios, minimos, maximos, offsets
+
+    @staticmethod
+    def eoq_descuentos_lote(
+        D: ArrayLike,
+        C3: ArrayLike,
+        i: ArrayLike,
+        precios: np.ndarray,
+        minimos: Optional[np.ndarray] = None,
+        maximos: Optional[np.ndarray] = None,
+        offsets: Optional[np.ndarray] = None,
+    ) -> Tuple[EOQLote, np.ndarray]:
+        """EOQ con Descuentos para muchos SKU a la vez.
+
+        Los tramos van en formato CSR (``offsets`` de largo n+1 y arrays
+        planos ``precios``/``minimos``/``maximos``) o, sin ``offsets``, en
+        matrices (n, k) rellenas con NaN. Un mínimo o máximo ausente (NaN)
+        equivale a 0 o a infinito. Devuelve el EOQLote del mejor tramo de
+        cada SKU y el costo total de todos los tramos (plano, alineado con
+        ``precios``) para auditoría.
+        """
+        precios, minimos, maximos, offsets = GestorStockPipeline._tramos_csr(
+            precios, minimos, maximos, offsets
+        )
+        n = len(offsets) - 1
+        largo = np.diff(offsets)
+        sku = np.repeat(np.arange(n), largo)
+
+        D, C3, i = (
+            np.broadcast_to(v, (n,)) for v in GestorStockPipeline._broadcast(D, C3, i)
+        )
+        codigo = GestorStockPipeline._validar_lote(D, None, C3)
+        codigo |= np.where(i > 0, 0, 64).astype(np.uint8)
+
+        Dt, C3t = D[sku], C3[sku]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            C1 = i[sku] * precios
+            Q = np.clip(np.sqrt(2 * Dt * C3t / C1), minimos, maximos)
+            costo = Dt * precios + (Dt / Q) * C3t + (Q / 2) * C1
+        costo_valido = np.where(
+            (precios > 0) & (minimos <= maximos) & np.isfinite(costo), costo, np.inf
+        )
+
+        menor = np.full(n, np.inf)
+        con_tramos = largo > 0
+        if costo_valido.size:
+            menor[con_tramos] = np.minimum.reduceat(
+                costo_valido, offsets[:-1][con_tramos]
+            )
+        # Primer tramo que alcanza el mínimo de su SKU (igual que el escalar)
+        pos = np.flatnonzero(np.isfinite(costo_valido) & (costo_valido == menor[sku]))
+        primero = np.diff(sku[pos], prepend=-1) != 0
+        elegido = np.full(n, -1, dtype=np.int64)
+        elegido[sku[pos[primero]]] = pos[primero]
+        codigo |= np.where(elegido >= 0, 0, 32).astype(np.uint8)
+
+        lote = EOQLote("descuentos", n)
+        lote.marcar(codigo)
+        if costo_valido.size:
+            k = np.where(elegido >= 0, elegido, 0)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                lote.asignar("Q_optimo", Q[k])
+                lote.asignar("precio_unitario", precios[k])
+                lote.asignar("costo_total", costo[k])
+                lote.asignar("costo_compra", D * precios[k])
+                lote.asignar("costo_ordenamiento", (D / Q[k]) * C3)
+                lote.asignar("costo_mantenimiento", (Q[k] / 2) * C1[k])
+                lote.asignar("tramo", k - offsets[:-1])
+        return lote, costo_valido
+
     @staticmethod
     def eoq_produccion(
         D: float,
@@ -158,24 +678,304 @@ class GestorStockPipeline:
             "factor_produccion": factor,
         }
 
+    @staticmethod
+    def eoq_produccion_lote(
+        D: Union[ArrayLike, pd.DataFrame],
+        C1: Optional[ArrayLike] = None,
+        C3: Optional[ArrayLike] = None,
+        d: ArrayLike = 0,
+        p: ArrayLike = 0,
+        C4: ArrayLike = 0,
+        dias: int = 365,
+    ) -> EOQLote:
+        """EOQ de Producción vectorizado (DataFrame con D, C1, C3, d, p y C4)"""
+        indice = None
+        if isinstance(D, pd.DataFrame):
+            indice = D.index
+            D, C1, C3, d, p, C4 = GestorStockPipeline._columnas(
+                D, {"D": None, "C1": None, "C3": None, "d": 0, "p": 0, "C4": 0}
+            )
+        D, C1, C3, d, p, C4 = GestorStockPipeline._broadcast(D, C1, C3, d, p, C4)
+        codigo = GestorStockPipeline._validar_lote(D, C1, C3, d=d, p=p)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            factor = np.where((d > 0) & (p > 0), 1 - d / p, 1.0)
+            Q = np.sqrt(2 * D * C3 / (C1 * factor))
+            Imax = Q * factor
+            pedidos = D / Q
+            costo_orden = pedidos * C3
+            costo_mant = (Imax / 2) * C1
+            ciclo = dias / pedidos
+            t_prod = np.where(p > 0, Q / p * dias, 0.0)
+
+        lote = EOQLote("produccion", len(D), indice)
+        lote.marcar(codigo)
+        lote.asignar("Q_optimo", Q)
+        lote.asignar("I_maximo", Imax)
+        lote.asignar("costo_total", D * C4 + costo_orden + costo_mant)
+        lote.asignar("costo_ordenamiento", costo_orden)
+        lote.asignar("costo_mantenimiento", costo_mant)
+        lote.asignar("numero_pedidos", pedidos)
+        lote.asignar("ciclo_dias", ciclo)
+        lote.asignar("tiempo_produccion_dias", t_prod)
+        lote.asignar("factor_produccion", factor)
+        return lote
+
+    CLASES_ABC = ("A", "B", "C")
+
+    @staticmethod
+    def _umbrales_abc(umbral_a: float, umbral_b: float) -> np.ndarray:
+        if not 0 < umbral_a <= umbral_b <= 1:
+            raise ValueError(
+                "Umbrales ABC como fracción: 0 < umbral_a <= umbral_b <= 1"
+            )
+        return np.array([umbral_a, umbral_b])
+
+    @staticmethod
+    def abc_kernel(
+        valores: np.ndarray,
+        umbral_a: float = 0.8,
+        umbral_b: float = 0.95,
+        total: Optional[float] = None,
+        orden: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Núcleo ABC sobre un array: (orden, fracción acumulada, códigos 0/1/2)
+
+        ``orden`` permite pasar el orden descendente estable ya calculado.
+        """
+        cortes = GestorStockPipeline._umbrales_abc(umbral_a, umbral_b)
+        valores = np.asarray(valores, dtype=np.float64)
+        total = np.nansum(valores) if total is None else total
+        if orden is None:
+            orden = np.argsort(-valores, kind="stable")
+        acum = np.cumsum(valores[orden]) / total
+        codigos = np.searchsorted(cortes, acum, side="left").astype(np.int8)
+        return orden, acum, codigos
+
     @staticmethod
     def abc(
-        data: pd.DataFrame, col: str, umbral_a: float = 0.8, umbral_b: float = 0.95
-    ) -> Tuple[pd.DataFrame, pd.DataFrame]:
-        """Clasificación ABC (Pareto)"""
-        df = data.copy().sort_values(col, ascending=False)
-        total = df[col].sum()
-        df["pct_valor"] = (df[col] / total) * 100
-        df["pct_acum"] = df["pct_valor"].cumsum()
-        df["clase"] = df["pct_acum"].apply(
-            lambda x: "A" if x <= umbral_a else ("B" if x <= umbral_b else "C")
+        data: pd.DataFrame,
+        col: str,
+        umbral_a: float = 0.8,
+        umbral_b: float = 0.95,
+        copiar: bool = True,
+        total: Optional[float] = None,
+        orden: Optional[np.ndarray] = None,
+    ) -> Tuple:
+        """Clasificación ABC (Pareto)
+
+        Los umbrales son fracciones del valor total (0.8 = 80%); ``pct_valor``
+        y ``pct_acum`` se informan en porcentaje. Con ``copiar=False`` no se
+        materializa el DataFrame y se devuelve ``(orden, clase)``: posiciones
+        de las filas de mayor a menor valor y su clase categórica. ``total``
+        fija el valor de referencia (por defecto, la suma de ``col``) y
+        ``orden`` reutiliza un orden descendente estable ya calculado.
+        """
+        valores = data[col].to_numpy(dtype=np.float64)
+        total = np.nansum(valores) if total is None else total
+        orden, acum, codigos = GestorStockPipeline.abc_kernel(
+            valores, umbral_a, umbral_b, total, orden
         )
+        clase = pd.Categorical.from_codes(
+            codigos, categories=list(GestorStockPipeline.CLASES_ABC)
+        )
+        if not copiar:
+            return orden, clase
+
+        df = data.take(orden)
+        df["pct_valor"] = valores[orden] / total * 100
+        df["pct_acum"] = acum * 100
+        df["clase"] = clase
 
         stats = (
-            df.groupby("clase")
+            df.groupby("clase", observed=True)
             .agg({col: ["sum", "count"], "pct_valor": "sum"})
             .round(2)
         )
         stats.columns = ["_".join(c).strip() for c in stats.columns.values]
 
         return df, stats
+
+    # Bordes log10 del histograma de la cola en el modo aproximado
+    BORDES_COLA = 10.0 ** np.arange(-2, 13)
+
+    @staticmethod
+    def _leer_bloques(ruta, columnas: Optional[List[str]], bloque: int):
+        """Itera DataFrames por bloques desde CSV o Parquet (``None`` = todas)"""
+        if isinstance(ruta, str) and ruta.endswith((".parquet", ".pq")):
+            try:
+                import pyarrow.parquet as pq
+            except ImportError:
+                # Sin pyarrow no hay lectura por bloques: pandas lee el archivo
+                df = pd.read_parquet(ruta, columns=columnas)
+                for a in range(0, max(len(df), 1), bloque):
+                    yield df.iloc[a : a + bloque]
+                return
+
+            archivo = pq.ParquetFile(ruta)
+            for lote in archivo.iter_batches(batch_size=bloque, columns=columnas):
+                yield lote.to_pandas()
+        else:
+            yield from pd.read_csv(ruta, usecols=columnas, chunksize=bloque)
+
+    @staticmethod
+    def abc_archivo(
+        ruta,
+        col: str,
+        clave: Optional[str] = None,
+        umbral_a: float = 0.8,
+        umbral_b: float = 0.95,
+        bloque: int = 1_000_000,
+        top_k: Optional[int] = None,
+    ) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """Clasificación ABC por bloques sobre un CSV o Parquet mayor que la RAM
+
+        Lee solo ``clave`` y ``col``, agrega el valor por clave bloque a bloque
+        y aplica el corte de Pareto sobre los totales, con memoria acotada por
+        el número de claves. Sin ``clave`` cada fila es un ítem y se
+        conservan todas las columnas del archivo, como en ``abc``.
+
+        Con ``top_k`` el modo es aproximado: solo se conservan las ``top_k``
+        claves de mayor valor; el resto se resume en la fila "cola" de las
+        estadísticas, con un histograma log10 y una cota del error por clave
+        en ``df.attrs``. Los porcentajes usan el total exacto del archivo.
+        """
+        G = GestorStockPipeline
+        if clave is None:
+            if top_k is not None:
+                raise ValueError("El modo aproximado requiere una columna clave")
+            data = pd.concat(
+                list(G._leer_bloques(ruta, None, bloque)), ignore_index=True
+            )
+            return G.abc(data, col, umbral_a, umbral_b)
+
+        acum = None
+        total = cola = cota = 0.0
+        histograma = np.zeros(len(G.BORDES_COLA) + 1, dtype=np.int64)
+        for b in G._leer_bloques(ruta, [clave, col], bloque):
+            parcial = b.groupby(clave, sort=False)[col].sum()
+            total += parcial.sum()
+            acum = (
+                parcial
+                if acum is None
+                else pd.concat([acum, parcial]).groupby(level=0, sort=False).sum()
+            )
+            if top_k is not None and len(acum) > top_k:
+                acum = acum.sort_values(ascending=False)
+                fuera = acum.to_numpy()[top_k:]
+                acum = acum.iloc[:top_k]
+                cola += fuera.sum()
+                cota += fuera[0]
+                histograma += np.bincount(
+                    np.searchsorted(G.BORDES_COLA, fuera),
+                    minlength=len(histograma),
+                )
+
+        if acum is None:
+            acum = pd.Series(dtype=np.float64, name=col)
+        data = acum.rename(col).rename_axis(clave).reset_index()
+        if top_k is None:
+            return G.abc(data, col, umbral_a, umbral_b)
+
+        df, stats = G.abc(data, col, umbral_a, umbral_b, total=total)
+        if cola:
+            stats.loc["cola"] = [round(cola, 2), np.nan, round(cola / total * 100, 2)]
+        df.attrs["cota_error"] = cota
+        df.attrs["cola_histograma"] = pd.Series(
+            histograma, index=pd.Index(np.r_[G.BORDES_COLA, np.inf], name="hasta")
+        )
+        return df, stats
+
+    @staticmethod
+    def _abc_segmentado(
+        valores: np.ndarray, grupos: np.ndarray, cortes: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """ABC por grupo con un cumsum segmentado: (fracción acumulada, códigos)
+
+        Ambos resultados vuelven en el orden original de las filas. El
+        cumsum se reinicia en cada grupo, así el resultado de un grupo no
+        depende de los demás.
+        """
+        valores = np.nan_to_num(np.asarray(valores, dtype=np.float64))
+        orden = np.lexsort((-valores, grupos))
+        g = grupos[orden]
+        acum = pd.Series(valores[orden]).groupby(g, sort=False).cumsum().to_numpy()
+
+        inicios = np.flatnonzero(np.r_[True, g[1:] != g[:-1]])
+        conteos = np.diff(np.r_[inicios, len(g)])
+        total = acum[inicios + conteos - 1]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            frac = acum / np.repeat(total, conteos)
+
+        salida = np.empty_like(frac)
+        salida[orden] = frac
+        return salida, np.searchsorted(cortes, salida, side="left").astype(np.int8)
+
+    @staticmethod
+    def abc_grupos(
+        data: pd.DataFrame,
+        criterios: Union[str, List[str]],
+        by: Optional[Union[str, List[str]]] = None,
+        umbral_a: float = 0.8,
+        umbral_b: float = 0.95,
+    ) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """Clasificación ABC por grupo y por varios criterios en una pasada
+
+        Devuelve, alineado con ``data.index``, ``pct_acum_<criterio>`` y
+        ``clase_<criterio>`` por criterio más la clase combinada (p. ej.
+        "AB"), y la matriz de clasificación cruzada: conteo de filas por
+        grupo y combinación de clases.
+        """
+        criterios = [criterios] if isinstance(criterios, str) else list(criterios)
+        cortes = GestorStockPipeline._umbrales_abc(umbral_a, umbral_b)
+        grupos, claves = GestorStockPipeline._grupos_abc(data, by)
+        resultados = [
+            GestorStockPipeline._abc_segmentado(
+                data[c].to_numpy(dtype=np.float64), grupos, cortes
+            )
+            for c in criterios
+        ]
+        return GestorStockPipeline._abc_grupos_frame(
+            data.index, criterios, resultados, grupos, claves
+        )
+
+    @staticmethod
+    def _grupos_abc(
+        data: pd.DataFrame, by: Optional[Union[str, List[str]]]
+    ) -> Tuple[np.ndarray, pd.Index]:
+        """Código de grupo por fila y claves de grupo en orden"""
+        if by is None:
+            return np.zeros(len(data), dtype=np.int64), pd.Index(
+                ["total"], name="grupo"
+            )
+        gb = data.groupby(by, sort=True, dropna=False, observed=True)
+        return gb.ngroup().to_numpy(), gb.size().index
+
+    @staticmethod
+    def _abc_grupos_frame(
+        indice: pd.Index,
+        criterios: List[str],
+        resultados: List[Tuple[np.ndarray, np.ndarray]],
+        grupos: np.ndarray,
+        claves: pd.Index,
+    ) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """Arma la salida de abc_grupos a partir de (fracción, códigos) por criterio"""
+        clases = list(GestorStockPipeline.CLASES_ABC)
+        res = pd.DataFrame(index=indice)
+        combinado = np.zeros(len(indice), dtype=np.int64)
+        for c, (frac, codigos) in zip(criterios, resultados):
+            res[f"pct_acum_{c}"] = frac * 100
+            res[f"clase_{c}"] = pd.Categorical.from_codes(codigos, categories=clases)
+            combinado = combinado * len(clases) + codigos
+
+        etiquetas = [""]
+        for _ in criterios:
+            etiquetas = [e + k for e in etiquetas for k in clases]
+        res["clase"] = pd.Categorical.from_codes(combinado, categories=etiquetas)
+
+        m = len(etiquetas)
+        conteo = np.bincount(grupos * m + combinado, minlength=len(claves) * m)
+        matriz = pd.DataFrame(
+            conteo.reshape(len(claves), m), index=claves, columns=etiquetas
+        )
+        return res, matriz
@@ -0,0 +1,166 @@
+"""
+Estocástico Pipeline - Stock de Seguridad por Monte Carlo
+
+Punto de reorden con demanda y lead time aleatorios para muchos SKU.
+"""
+
+from typing import Optional, Union
+import numpy as np
+import pandas as pd
+
+from src.pipelines.business import ArrayLike, GestorStockPipeline
+
+
+class StockSeguridadPipeline:
+    """Stock de seguridad y punto de reorden simulados por SKU"""
+
+    # Celdas (SKU × escenario) por bloque: ~64 MB en float64
+    CELDAS_BLOQUE = 2**23
+
+    @staticmethod
+    def escenarios(
+        mu: np.ndarray,
+        sigma: np.ndarray,
+        lead_time: np.ndarray,
+        sigma_lead: np.ndarray,
+        n: int,
+        rng: np.random.Generator,
+        residuos: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """Demanda durante el lead time: matriz (SKU × escenarios)
+
+        El lead time sigue una Gamma con media ``lead_time`` y desvío
+        ``sigma_lead`` (fijo si el desvío es 0). La demanda diaria es
+        normal, o bien usa los ``residuos`` estandarizados remuestreados y
+        escalados por ``sigma * sqrt(L)``.
+        """
+        m = len(mu)
+        mu, sigma = mu[:, None], sigma[:, None]
+        L = np.broadcast_to(lead_time[:, None], (m, n))
+        variable = sigma_lead > 0
+        if variable.any():
+            if np.any(lead_time[variable] <= 0):
+                raise ValueError("lead_time debe ser positivo si sigma_lead > 0")
+            forma = (lead_time[variable] / sigma_lead[variable]) ** 2
+            escala = sigma_lead[variable] ** 2 / lead_time[variable]
+            L = L.copy()
+            L[variable] = rng.gamma(forma[:, None], escala[:, None], (forma.size, n))
+
+        if residuos is None:
+            z = rng.standard_normal((m, n))
+        else:
+            z = rng.choice(residuos, size=(m, n))
+        return np.maximum(mu * L + sigma * np.sqrt(L) * z, 0)
+
+    @staticmethod
+    def _punto_fill_rate(x: np.ndarray, faltante: np.ndarray) -> np.ndarray:
+        """Punto de reorden con faltante esperado por ciclo igual a ``faltante``
+
+        ``x`` debe venir ordenado por fila. El faltante esperado E[(X - s)+] es
+        lineal a trozos entre escenarios, así que se resuelve de forma exacta.
+        """
+        c, n = x.shape
+        cola = np.cumsum(x[:, ::-1], axis=1)[:, ::-1]
+        esperado = (cola - (n - np.arange(n)) * x) / n
+        k = np.minimum((esperado > faltante[:, None]).sum(axis=1), n - 1)
+        filas = np.arange(c)
+        return (cola[filas, k] - n * faltante) / (n - k)
+
+    @staticmethod
+    def calcular(
+        mu: Union[ArrayLike, pd.DataFrame],
+        sigma: Optional[ArrayLike] = None,
+        lead_time: ArrayLike = 0,
+        sigma_lead: ArrayLike = 0,
+        Q: Optional[ArrayLike] = None,
+        nivel: float = 0.95,
+        objetivo: str = "ciclo",
+        escenarios: int = 10_000,
+        residuos=None,
+        seed: Optional[int] = None,
+        bloque: Optional[int] = None,
+    ) -> pd.DataFrame:
+        """Stock de seguridad y punto de reorden para un nivel de servicio
+
+        ``mu``/``sigma`` son la media y el desvío de la demanda diaria (o un
+        DataFrame con columnas mu, sigma, lead_time, sigma_lead y Q).
+        ``objetivo="ciclo"`` fija la probabilidad de no quebrar en el ciclo;
+        ``objetivo="fill_rate"`` fija la fracción de demanda servida y
+        requiere ``Q``. ``residuos`` acepta un array o un MLPipeline
+        entrenado; en ese caso ``sigma`` por defecto es su desvío.
+        Los SKU se procesan por bloques para acotar la memoria.
+        """
+        if objetivo not in ("ciclo", "fill_rate"):
+            raise ValueError("objetivo debe ser 'ciclo' o 'fill_rate'")
+        if not 0 < nivel < 1:
+            raise ValueError("nivel debe estar entre 0 y 1")
+
+        indice = None
+        if isinstance(mu, pd.DataFrame):
+            indice = mu.index
+            mu, sigma, lead_time, sigma_lead, Q = GestorStockPipeline._columnas(
+                mu,
+                {
+                    "mu": None,
+                    "sigma": np.nan if sigma is None else sigma,
+                    "lead_time": lead_time,
+                    "sigma_lead": sigma_lead,
+                    "Q": np.nan if Q is None else Q,
+                },
+            )
+        if residuos is not None:
+            residuos = getattr(residuos, "residuos", residuos)
+            if residuos is None or len(residuos) < 2:
+                raise ValueError("Se necesitan residuos de un modelo entrenado")
+            residuos = np.asarray(residuos, dtype=np.float64)
+            if sigma is None or np.all(np.isnan(sigma)):
+                sigma = residuos.std()
+            residuos = (residuos - residuos.mean()) / residuos.std()
+        if sigma is None:
+            raise ValueError("Falta sigma o residuos")
+        if objetivo == "fill_rate" and (Q is None or np.all(np.isnan(Q))):
+            raise ValueError("El objetivo fill_rate requiere Q")
+
+        mu, sigma, lead_time, sigma_lead, Q = GestorStockPipeline._broadcast(
+            mu, sigma, lead_time, sigma_lead, np.nan if Q is None else Q
+        )
+        if np.isnan(sigma).any():
+            raise ValueError("sigma tiene valores faltantes: indique sigma o residuos")
+        if np.any((sigma_lead > 0) & ~(lead_time > 0)):
+            raise ValueError("lead_time debe ser positivo si sigma_lead > 0")
+        m = len(mu)
+        bloque = bloque or max(1, StockSeguridadPipeline.CELDAS_BLOQUE // escenarios)
+        rng = np.random.default_rng(seed)
+
+        punto = np.empty(m)
+        ciclo = np.empty(m)
+        fill = np.empty(m)
+        for a in range(0, m, bloque):
+            b = slice(a, min(a + bloque, m))
+            x = StockSeguridadPipeline.escenarios(
+                mu[b], sigma[b], lead_time[b], sigma_lead[b], escenarios, rng, residuos
+            )
+            if objetivo == "ciclo":
+                k = min(int(np.ceil(nivel * escenarios)), escenarios) - 1
+                x.partition(k, axis=1)
+                punto[b] = x[:, k]
+            else:
+                x.sort(axis=1)
+                punto[b] = StockSeguridadPipeline._punto_fill_rate(
+                    x, (1 - nivel) * Q[b]
+                )
+            ciclo[b] = (x <= punto[b, None]).mean(axis=1)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                fill[b] = 1 - np.maximum(x - punto[b, None], 0).mean(axis=1) / Q[b]
+
+        media = mu * lead_time
+        return pd.DataFrame(
+            {
+                "demanda_lead_media": media,
+                "stock_seguridad": punto - media,
+                "punto_reorden": punto,
+                "nivel_ciclo": ciclo,
+                "fill_rate": fill,
+            },
+            index=indice,
+        )
@@ -0,0 +1,203 @@
+"""
+Features Pipeline - Features de Series de Demanda
+
+Lags, ventanas móviles, medias exponenciales y calendario para muchas
+series a la vez, sobre un array float32 contiguo y con caché.
+"""
+
+import os
+from typing import Dict, Iterable, Optional, Sequence
+import joblib
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import lfilter
+
+
+class FeaturesPipeline:
+    """Etapa de features para una o muchas series (formato largo)
+
+    Todas las features de la fila t usan solo valores anteriores a t, así
+    sirven para pronosticar sin fuga de información. Las que necesitan más
+    historia de la que hay en la serie quedan en NaN.
+    """
+
+    ESTADISTICOS = ("media", "std", "min", "max")
+    # Filas por trozo al reducir ventanas (acota la memoria temporal)
+    FILAS_BLOQUE = 2**18
+    # Matrices que se conservan en la caché en memoria
+    CACHE_MAX = 8
+
+    _cache: Dict[str, pd.DataFrame] = {}
+
+    def __init__(
+        self,
+        lags: Sequence[int] = (1, 7, 14, 28),
+        ventanas: Sequence[int] = (7, 28),
+        estadisticos: Sequence[str] = ESTADISTICOS,
+        alfas: Sequence[float] = (0.1, 0.3),
+        calendario: bool = True,
+        feriados: Optional[Iterable] = None,
+        directorio: Optional[str] = None,
+    ):
+        extra = set(estadisticos) - set(self.ESTADISTICOS)
+        if extra:
+            raise ValueError(f"Estadísticos válidos: {self.ESTADISTICOS}")
+        if any(int(v) < 1 for v in (*lags, *ventanas)):
+            raise ValueError("Lags y ventanas deben ser positivos")
+        if any(not 0 < a <= 1 for a in alfas):
+            raise ValueError("Cada alfa debe estar en (0, 1]")
+        self.lags = tuple(int(v) for v in lags)
+        self.ventanas = tuple(int(v) for v in ventanas)
+        self.estadisticos = tuple(estadisticos)
+        self.alfas = tuple(float(a) for a in alfas)
+        self.calendario = calendario
+        self.feriados = pd.DatetimeIndex(pd.to_datetime(list(feriados or [])))
+        self.directorio = directorio
+
+    def _spec(self) -> tuple:
+        return (
+            self.lags,
+            self.ventanas,
+            self.estadisticos,
+            self.alfas,
+            self.calendario,
+            tuple(self.feriados.asi8),
+        )
+
+    def transformar(
+        self,
+        datos: pd.DataFrame,
+        valor: str = "demanda",
+        fecha: str = "fecha",
+        serie: Optional[str] = None,
+    ) -> pd.DataFrame:
+        """Matriz de features float32 alineada con ``datos.index``
+
+        ``serie`` identifica cada serie en un DataFrame largo; sin ella se
+        trata como una sola serie. El resultado se cachea en memoria (y en
+        ``directorio``, si se indicó) por hash de los datos y de la
+        configuración: recalcular con otro modelo no rehace las features.
+        """
+        fechas = pd.to_datetime(datos[fecha])
+        x = datos[valor].to_numpy(dtype=np.float32)
+        if np.isnan(x).any():
+            raise ValueError(f"La columna '{valor}' tiene valores faltantes")
+        codigos = (
+            np.zeros(len(datos), dtype=np.int64)
+            if serie is None
+            else pd.factorize(datos[serie])[0]
+        )
+        clave = joblib.hash((x, codigos, fechas.to_numpy(), self._spec()))
+        if clave in self._cache:
+            return self._cache[clave].set_axis(datos.index)
+        ruta = (
+            os.path.join(self.directorio, f"{clave}.joblib")
+            if self.directorio
+            else None
+        )
+        if ruta and os.path.exists(ruta):
+            F = joblib.load(ruta)
+        else:
+            F = self._calcular(x, codigos, fechas)
+            if ruta:
+                os.makedirs(self.directorio, exist_ok=True)
+                joblib.dump(F, ruta)
+        if len(self._cache) >= self.CACHE_MAX:
+            self._cache.pop(next(iter(self._cache)))
+        self._cache[clave] = F
+        return F.set_axis(datos.index)
+
+    def _calcular(
+        self, x: np.ndarray, codigos: np.ndarray, fechas: pd.Series
+    ) -> pd.DataFrame:
+        """Ordena una vez por (serie, fecha) y calcula todo sobre ese orden"""
+        n = len(x)
+        orden = np.lexsort((fechas.to_numpy(), codigos))
+        v = np.ascontiguousarray(x[orden])
+        c = codigos[orden]
+        inicio = np.flatnonzero(np.r_[True, c[1:] != c[:-1]])
+        largo = np.diff(np.r_[inicio, n])
+        # Posición de cada fila dentro de su serie
+        pos = np.arange(n) - np.repeat(inicio, largo)
+
+        columnas: Dict[str, np.ndarray] = {}
+        for L in self.lags:
+            col = np.full(n, np.nan, dtype=np.float32)
+            if L < n:
+                col[L:] = v[:-L]
+            col[pos < L] = np.nan
+            columnas[f"lag_{L}"] = col
+
+        for w in self.ventanas:
+            for nombre, col in self._ventana(v, w).items():
+                # La ventana de la fila i termina en i - 1: R[i - w]
+                salida = np.full(n, np.nan, dtype=np.float32)
+                if w < n:
+                    salida[w:] = col[: n - w]
+                salida[pos < w] = np.nan
+                columnas[f"{nombre}_{w}"] = salida
+
+        for a in self.alfas:
+            m = self._ewm(v, inicio, largo, a)
+            salida = np.full(n, np.nan, dtype=np.float32)
+            salida[1:] = m[:-1]
+            salida[pos < 1] = np.nan
+            columnas[f"ewm_{a:g}"] = salida
+
+        if self.calendario:
+            f = pd.DatetimeIndex(fechas.to_numpy()[orden])
+            columnas["dia"] = ((f - f.min()) // pd.Timedelta(days=1)).to_numpy(
+                np.float32
+            )
+            columnas["mes"] = f.month.to_numpy(np.float32)
+            columnas["trimestre"] = f.quarter.to_numpy(np.float32)
+            columnas["dia_semana"] = f.dayofweek.to_numpy(np.float32)
+            columnas["dia_mes"] = f.day.to_numpy(np.float32)
+            columnas["fin_de_semana"] = (f.dayofweek >= 5).astype(np.float32)
+            if len(self.feriados):
+                columnas["feriado"] = (
+                    f.normalize().isin(self.feriados).astype(np.float32)
+                )
+
+        # Vuelve al orden original de las filas
+        F = np.empty((n, len(columnas)), dtype=np.float32, order="F")
+        for j, col in enumerate(columnas.values()):
+            F[orden, j] = col
+        return pd.DataFrame(F, columns=list(columnas), copy=False)
+
+    def _ventana(self, v: np.ndarray, w: int) -> Dict[str, np.ndarray]:
+        """Estadísticos de cada ventana completa v[j:j+w] (largo n - w + 1)"""
+        if len(v) < w:
+            return {e: np.empty(0, dtype=np.float32) for e in self.estadisticos}
+        vistas = sliding_window_view(v, w)
+        salida = {e: np.empty(len(vistas), dtype=np.float32) for e in self.estadisticos}
+        if "media" in salida:
+            acum = np.r_[0.0, np.cumsum(v, dtype=np.float64)]
+            salida["media"][:] = (acum[w:] - acum[:-w]) / w
+        for a in range(0, len(vistas), self.FILAS_BLOQUE):
+            trozo = vistas[a : a + self.FILAS_BLOQUE].astype(np.float64)
+            b = a + len(trozo)
+            if "std" in salida:
+                salida["std"][a:b] = trozo.std(axis=1, ddof=1) if w > 1 else np.nan
+            if "min" in salida:
+                salida["min"][a:b] = trozo.min(axis=1)
+            if "max" in salida:
+                salida["max"][a:b] = trozo.max(axis=1)
+        return salida
+
+    @staticmethod
+    def _ewm(
+        v: np.ndarray, inicio: np.ndarray, largo: np.ndarray, alfa: float
+    ) -> np.ndarray:
+        """EWM (adjust=False) por serie con un solo filtro lineal
+
+        Se filtra el array completo y se descuenta el arrastre de la serie
+        anterior: m_i = y_i + (1-α)^(i-s+1) (x_s - y_{s-1}), con s el inicio.
+        """
+        x = v.astype(np.float64)
+        y = lfilter([alfa], [1.0, alfa - 1.0], x)
+        previo = np.r_[0.0, y][inicio]
+        delta = np.repeat(x[inicio] - previo, largo)
+        pos = np.arange(len(x)) - np.repeat(inicio, largo)
+        return y + (1 - alfa) ** (pos + 1) * delta
@@ -4,11 +4,20 @@ ML Pipeline - Modelos de Predicción de Demanda
 Pipeline de Machine Learning para forecasting.
 """
 
-from dataclasses import dataclass
-from typing import Dict, List, Tuple, Optional
+import json
+import os
+import time
+import warnings
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Dict, Iterator, List, Tuple, Optional, Sequence, Union
+import joblib
+from joblib import Parallel, delayed
 import numpy as np
 import pandas as pd
-from sklearn.linear_model import LinearRegression, Ridge
+from sklearn.linear_model import LinearRegression, Ridge, SGDRegressor
+from sklearn.pipeline import Pipeline, make_pipeline
+from sklearn.preprocessing import StandardScaler
 from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
@@ -22,6 +31,11 @@ class Metricas:
     r2: float
 
 
+def _sgd(**hiper) -> Pipeline:
+    """SGDRegressor con escalado; el escalador queda fijo tras el ajuste inicial"""
+    return make_pipeline(StandardScaler(), SGDRegressor(**hiper))
+
+
 class MLPipeline:
     """Pipeline de ML para predicción"""
 
@@ -30,48 +44,722 @@ class MLPipeline:
         "ridge": Ridge,
         "rf": RandomForestRegressor,
         "gb": GradientBoostingRegressor,
+        "sgd": _sgd,
     }
 
     def __init__(self, modelo: str = "lineal", hiper: Optional[Dict] = None):
         if modelo not in self.MODELOS:
             raise ValueError(f"Modelo '{modelo}' no disponible")
-        self.modelo = self.MODELOS[modelo](**(hiper or {}))
+        self.tipo = modelo
+        self.hiper = dict(hiper or {})
+        self.modelo = self.MODELOS[modelo](**self.hiper)
         self.entrenado = False
         self.features: Optional[List[str]] = None
+        self.residuos: Optional[np.ndarray] = None
+        self.metricas: Optional[Metricas] = None
+        self.tiempos: Dict[str, float] = {}
+        self.backtest: Optional[pd.DataFrame] = None
+        # Estado incremental: sumas suficientes (lineal/ridge), acumulados
+        # de error prequential [n, Σe², Σ|e|, Σy, Σy²], MSE reciente y
+        # árboles del último ajuste completo (rf/gb)
+        self._suficientes: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        self._acum = np.zeros(5)
+        self.mse_reciente: Optional[float] = None
+        self._arboles_base: Optional[int] = None
 
     def entrenar(
-        self, X: pd.DataFrame, y: pd.Series, test: float = 0.2, seed: int = 42
+        self,
+        X: pd.DataFrame,
+        y: pd.Series,
+        test: float = 0.2,
+        seed: int = 42,
+        validacion: Optional[str] = None,
+        folds: int = 5,
+        ventana: Optional[int] = None,
+        n_jobs: int = -1,
     ) -> Metricas:
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=test, random_state=seed
-        )
+        """Entrena y mide el modelo
+
+        Por defecto usa una partición aleatoria. Con ``validacion`` igual a
+        "expanding" o "rolling" hace backtesting sobre filas en orden
+        cronológico: ``folds`` bloques de prueba consecutivos que cubren la
+        fracción ``test`` final, entrenando con todo el pasado o con las
+        ``ventana`` filas previas. Los folds corren en paralelo; las
+        métricas por fold quedan en ``self.backtest`` y se devuelven las
+        agregadas sobre todas las predicciones fuera de muestra. El modelo
+        final se ajusta con todas las filas.
+        """
         self.features = list(X.columns)
+        # Estimador nuevo: no hereda warm start ni árboles de ``actualizar``
+        self.modelo = self.MODELOS[self.tipo](**self.hiper)
+        if validacion is None:
+            X_train, X_test, y_train, y_test = train_test_split(
+                X, y, test_size=test, random_state=seed
+            )
+            return self._ajustar(X_train, X_test, y_train, y_test)
+        if validacion not in ("expanding", "rolling"):
+            raise ValueError("validacion debe ser 'expanding' o 'rolling'")
+
+        Xa = np.ascontiguousarray(X.to_numpy(dtype=np.float64))
+        ya = np.asarray(y, dtype=np.float64)
+        cortes = MLPipeline.folds_temporales(len(ya), folds, test, ventana, validacion)
+        partes = Parallel(n_jobs=n_jobs)(
+            delayed(MLPipeline._evaluar_fold)(
+                self.tipo, self.hiper, self.features, Xa, ya, tr, te
+            )
+            for tr, te in cortes
+        )
+        self.backtest = pd.DataFrame(
+            [
+                {
+                    "fold": k,
+                    "inicio_train": tr.start,
+                    "fin_train": tr.stop,
+                    "fin_test": te.stop,
+                    **asdict(met),
+                    **tiempos,
+                }
+                for k, ((tr, te), (met, _, tiempos)) in enumerate(zip(cortes, partes))
+            ]
+        ).set_index("fold")
+
+        self.residuos = np.concatenate([r for _, r, _ in partes])
+        real = np.concatenate([ya[te] for _, te in cortes])
+        self.metricas = MLPipeline._metricas(real, real - self.residuos)
+        self.modelo.fit(pd.DataFrame(Xa, columns=self.features, copy=False), ya)
+        self.entrenado = True
+        self._reiniciar_online(Xa, ya)
+        return self.metricas
+
+    @staticmethod
+    def folds_temporales(
+        n: int,
+        folds: int = 5,
+        test: float = 0.2,
+        ventana: Optional[int] = None,
+        modo: str = "expanding",
+    ) -> List[Tuple[slice, slice]]:
+        """Particiones (train, test) cronológicas como slices sobre las filas"""
+        horizonte = int(n * test) // folds
+        inicio = n - folds * horizonte
+        if horizonte < 1 or inicio < 1:
+            raise ValueError("Muy pocas filas para esos folds")
+        ventana = inicio if ventana is None else ventana
+        cortes = []
+        for k in range(folds):
+            a = inicio + k * horizonte
+            desde = max(0, a - ventana) if modo == "rolling" else 0
+            cortes.append((slice(desde, a), slice(a, a + horizonte)))
+        return cortes
+
+    @staticmethod
+    def _evaluar_fold(
+        tipo: str, hiper: Dict, features: List[str], X, y, train: slice, test: slice
+    ) -> Tuple[Metricas, np.ndarray, Dict[str, float]]:
+        # Los slices son vistas: ningún fold copia el array completo
+        pipe = MLPipeline._ajustar_variante(
+            tipo, hiper, features, X[train], X[test], y[train], y[test]
+        )
+        return pipe.metricas, pipe.residuos, pipe.tiempos
+
+    @staticmethod
+    def _metricas(real: np.ndarray, pred: np.ndarray) -> Metricas:
+        mse = float(mean_squared_error(real, pred))
+        return Metricas(
+            mse=mse,
+            rmse=float(np.sqrt(mse)),
+            mae=float(mean_absolute_error(real, pred)),
+            r2=float(r2_score(real, pred)),
+        )
+
+    def _ajustar(self, X_train, X_test, y_train, y_test) -> Metricas:
+        """Ajusta sobre train, mide sobre test y registra los tiempos"""
+        inicio = time.perf_counter()
         self.modelo.fit(X_train, y_train)
+        self.entrenado = True
+        self._reiniciar_online(X_train, y_train)
 
+        medio = time.perf_counter()
         pred = self.modelo.predict(X_test)
-        return Metricas(
-            mse=mean_squared_error(y_test, pred),
-            rmse=np.sqrt(mean_squared_error(y_test, pred)),
-            mae=mean_absolute_error(y_test, pred),
-            r2=r2_score(y_test, pred),
+        self.tiempos = {
+            "t_ajuste": medio - inicio,
+            "t_prediccion": time.perf_counter() - medio,
+        }
+        self.residuos = np.asarray(y_test, dtype=np.float64) - pred
+        self.metricas = MLPipeline._metricas(y_test, pred)
+        return self.metricas
+
+    @staticmethod
+    def _ajustar_variante(
+        tipo: str, hiper: Dict, features: List[str], X_train, X_test, y_train, y_test
+    ) -> "MLPipeline":
+        pipe = MLPipeline(tipo, hiper)
+        pipe.features = features
+        # Vista sin copia sobre los arrays (memmap en los workers)
+        pipe._ajustar(
+            pd.DataFrame(X_train, columns=features, copy=False),
+            pd.DataFrame(X_test, columns=features, copy=False),
+            y_train,
+            y_test,
+        )
+        return pipe
+
+    @staticmethod
+    def comparar(
+        X: pd.DataFrame,
+        y: pd.Series,
+        variantes: Optional[Dict[str, Tuple[str, Dict]]] = None,
+        test: float = 0.2,
+        seed: int = 42,
+        n_jobs: int = -1,
+    ) -> Tuple[pd.DataFrame, Dict[str, "MLPipeline"]]:
+        """Entrena todos los MODELOS (más ``variantes``) en paralelo
+
+        ``variantes`` agrega entradas ``nombre -> (tipo, hiper)``. Todas usan
+        la misma partición que ``entrenar``; joblib mapea en memoria los
+        arrays de entrenamiento en lugar de copiarlos a cada proceso.
+        Devuelve la tabla ordenada por RMSE (métricas y tiempos en segundos)
+        y los pipelines entrenados por nombre.
+        """
+        candidatos = {m: (m, {}) for m in MLPipeline.MODELOS}
+        candidatos.update(variantes or {})
+        for tipo, _ in candidatos.values():
+            if tipo not in MLPipeline.MODELOS:
+                raise ValueError(f"Modelo '{tipo}' no disponible")
+
+        features = list(X.columns)
+        partes = train_test_split(
+            np.ascontiguousarray(X.to_numpy(dtype=np.float64)),
+            np.asarray(y, dtype=np.float64),
+            test_size=test,
+            random_state=seed,
+        )
+        ajustados = Parallel(n_jobs=n_jobs)(
+            delayed(MLPipeline._ajustar_variante)(tipo, hiper, features, *partes)
+            for tipo, hiper in candidatos.values()
         )
+        pipes = dict(zip(candidatos, ajustados))
+        tabla = pd.DataFrame(
+            [
+                {
+                    "modelo": nombre,
+                    "tipo": p.tipo,
+                    **asdict(p.metricas),
+                    **p.tiempos,
+                }
+                for nombre, p in pipes.items()
+            ]
+        )
+        tabla = tabla.sort_values("rmse", kind="stable").set_index("modelo")
+        return tabla, pipes
+
+    @staticmethod
+    def _muestrear(espacio: Dict, n: int, rng: np.random.Generator) -> List[Dict]:
+        """Configuraciones distintas al azar: listas = opciones, tuplas = rango"""
+        configs, vistas = [], set()
+        for _ in range(20 * n):
+            config = {}
+            for k, v in espacio.items():
+                if isinstance(v, tuple):
+                    lo, hi = v
+                    config[k] = (
+                        int(rng.integers(lo, hi + 1))
+                        if isinstance(lo, int) and isinstance(hi, int)
+                        else float(rng.uniform(lo, hi))
+                    )
+                else:
+                    config[k] = v[rng.integers(len(v))]
+            clave = tuple(sorted(config.items(), key=lambda kv: kv[0]))
+            if clave not in vistas:
+                vistas.add(clave)
+                configs.append(config)
+                if len(configs) == n:
+                    break
+        return configs
+
+    @staticmethod
+    def _evaluar_config(
+        tipo: str, config: Dict, features: List[str], X_tr, y_tr, X_te, y_te, filas
+    ) -> Metricas:
+        pipe = MLPipeline._ajustar_variante(
+            tipo, config, features, X_tr[filas], X_te, y_tr[filas], y_te
+        )
+        return pipe.metricas
+
+    @staticmethod
+    def buscar(
+        X: pd.DataFrame,
+        y: pd.Series,
+        tipo: str,
+        espacio: Dict,
+        recurso: str = "muestras",
+        max_recurso: Optional[int] = None,
+        n_candidatos: int = 27,
+        eta: int = 3,
+        presupuesto: Optional[float] = None,
+        temporal: bool = False,
+        test: float = 0.2,
+        seed: int = 42,
+        n_jobs: int = -1,
+        cache: Optional[Dict] = None,
+    ) -> Tuple[pd.DataFrame, "MLPipeline"]:
+        """Búsqueda de hiperparámetros por successive halving
+
+        Muestrea ``n_candidatos`` configuraciones de ``espacio`` (listas de
+        opciones o tuplas (mín, máx)) y las evalúa en paralelo con poco
+        recurso; en cada ronda sigue solo el mejor 1/``eta`` con ``eta``
+        veces más recurso. ``recurso`` es "muestras" (filas de
+        entrenamiento, las más recientes si ``temporal``) o "estimadores"
+        (n_estimators de rf/gb). ``presupuesto`` en segundos de reloj corta
+        las rondas (o la ronda en curso) que no alcanzan a terminar e incluye
+        el ajuste final: si el recurso completo no entra, el mejor se ajusta
+        con el mayor recurso alcanzado (``tabla.attrs["recurso_final"]``).
+        ``cache`` (dict reutilizable entre llamadas) evita repetir
+        evaluaciones. Devuelve la tabla de evaluaciones y el mejor pipeline
+        ajustado.
+        """
+        if tipo not in MLPipeline.MODELOS:
+            raise ValueError(f"Modelo '{tipo}' no disponible")
+        if recurso not in ("muestras", "estimadores"):
+            raise ValueError("recurso debe ser 'muestras' o 'estimadores'")
+        if recurso == "estimadores" and tipo not in ("rf", "gb"):
+            raise ValueError("El recurso 'estimadores' solo aplica a rf y gb")
+        inicio = time.perf_counter()
+        cache = {} if cache is None else cache
+
+        features = list(X.columns)
+        Xa = np.ascontiguousarray(X.to_numpy(dtype=np.float64))
+        ya = np.asarray(y, dtype=np.float64)
+        if temporal:
+            corte = len(ya) - int(len(ya) * test)
+            X_tr, X_te, y_tr, y_te = Xa[:corte], Xa[corte:], ya[:corte], ya[corte:]
+        else:
+            X_tr, X_te, y_tr, y_te = train_test_split(
+                Xa, ya, test_size=test, random_state=seed
+            )
+        huella = joblib.hash((tipo, features, X_tr, y_tr, X_te, y_te))
+
+        rondas = int(np.floor(np.log(n_candidatos) / np.log(eta) + 1e-9)) + 1
+        max_recurso = max_recurso or (len(y_tr) if recurso == "muestras" else 300)
+        configs = MLPipeline._muestrear(
+            espacio, n_candidatos, np.random.default_rng(seed)
+        )
+        workers = joblib.effective_n_jobs(n_jobs)
+        filas, duracion, mejor = [], None, None
+        # Segundos por ajuste y unidad de recurso (estimado con lo ya medido)
+        unitario, alcanzado, corte_alcanzado = None, None, slice(None)
+        for ronda in range(rondas):
+            r = max(1, int(max_recurso / eta ** (rondas - 1 - ronda)))
+            if presupuesto is not None and unitario is not None:
+                # Cada ronda cuesta parecido: candidatos / eta, recurso * eta;
+                # además debe quedar tiempo para reajustar el mejor con r
+                if time.perf_counter() - inicio + duracion + unitario * r > presupuesto:
+                    break
+            t0 = time.perf_counter()
+            if recurso == "estimadores":
+                corte, extra = slice(None), {"n_estimators": r}
+            else:
+                corte, extra = (slice(-r, None) if temporal else slice(0, r)), {}
+            tareas = []
+            for config in configs:
+                hiper = dict(config, **extra)
+                clave = (huella, tuple(sorted(hiper.items())), corte.start, corte.stop)
+                tareas.append((config, hiper, corte, clave))
+
+            nuevas = [t for t in tareas if t[3] not in cache]
+            evaluadas = Parallel(n_jobs=n_jobs, return_as="generator")(
+                delayed(MLPipeline._evaluar_config)(
+                    tipo, hiper, features, X_tr, y_tr, X_te, y_te, corte
+                )
+                for _, hiper, corte, _ in nuevas
+            )
+            agotado = False
+            for hechas, (t, m) in enumerate(zip(nuevas, evaluadas), 1):
+                cache[t[3]] = m
+                tandas = np.ceil(hechas / min(workers, len(nuevas)))
+                unitario = (time.perf_counter() - t0) / tandas / r
+                # Corta la ronda si no entran otra tanda y el ajuste final
+                agotado = (
+                    presupuesto is not None
+                    and hechas < len(nuevas)
+                    and time.perf_counter() - inicio + 2 * unitario * r > presupuesto
+                )
+                if agotado:
+                    with warnings.catch_warnings():
+                        # joblib avisa que cancela las tareas en curso
+                        warnings.simplefilter("ignore", UserWarning)
+                        evaluadas.close()
+                    break
+            duracion = time.perf_counter() - t0
+            alcanzado, corte_alcanzado = r, corte
+
+            ronda_filas = [
+                {"ronda": ronda, "recurso": r, **config, **asdict(cache[clave])}
+                for config, _, _, clave in tareas
+                if clave in cache
+            ]
+            evaluados = [config for config, _, _, clave in tareas if clave in cache]
+            filas.extend(ronda_filas)
+            orden = np.argsort([f["rmse"] for f in ronda_filas], kind="stable")
+            mejor = evaluados[orden[0]]
+            configs = [evaluados[k] for k in orden[: max(1, len(configs) // eta)]]
+            if agotado:
+                break
+
+        completo = max_recurso if recurso == "estimadores" else len(y_tr)
+        filas_final = slice(None)
+        if (
+            presupuesto is not None
+            and unitario is not None
+            and time.perf_counter() - inicio + unitario * completo > presupuesto
+        ):
+            # El ajuste completo no entra: se usa el recurso ya alcanzado
+            completo, filas_final = alcanzado, corte_alcanzado
+        final = dict(mejor)
+        if recurso == "estimadores":
+            final["n_estimators"] = completo
+        pipe = MLPipeline._ajustar_variante(
+            tipo, final, features, X_tr[filas_final], X_te, y_tr[filas_final], y_te
+        )
+        tabla = pd.DataFrame(filas)
+        tabla.attrs["recurso_final"] = completo
+        return tabla, pipe
 
     def predecir(self, vals: List[float]) -> float:
+        return float(self.predecir_lote(np.asarray(vals).reshape(1, -1))[0])
+
+    def predecir_lote(self, X: Union[pd.DataFrame, np.ndarray]) -> np.ndarray:
+        """Predice muchas filas en una sola llamada al modelo
+
+        Un DataFrame se reordena según ``self.features`` (las columnas
+        extra se ignoran); un array 2-D debe traer las columnas en ese orden.
+        """
         if not self.entrenado:
             raise ValueError("No entrenado")
-        return float(self.modelo.predict(np.array(vals).reshape(1, -1))[0])
+        if isinstance(X, pd.DataFrame):
+            faltan = [f for f in self.features if f not in X.columns]
+            if faltan:
+                raise ValueError(f"Faltan features: {faltan}")
+            X = X[self.features]
+        else:
+            X = np.asarray(X, dtype=np.float64)
+            if X.ndim != 2 or X.shape[1] != len(self.features):
+                raise ValueError(
+                    f"Se esperan {len(self.features)} columnas: {self.features}"
+                )
+            X = pd.DataFrame(X, columns=self.features, copy=False)
+        return self.modelo.predict(X)
+
+    @staticmethod
+    def _matriz_lineal(X) -> np.ndarray:
+        """X con una columna de unos al final (para el intercepto)"""
+        X = np.asarray(X, dtype=np.float64)
+        return np.column_stack([X, np.ones(len(X))])
+
+    def _reiniciar_online(self, X, y) -> None:
+        """Estado incremental tras un ajuste completo"""
+        self._acum = np.zeros(5)
+        self.mse_reciente = None
+        self._suficientes = None
+        self._arboles_base = (
+            len(self.modelo.estimators_) if self.tipo in ("rf", "gb") else None
+        )
+        if self.tipo in ("lineal", "ridge"):
+            A = self._matriz_lineal(X)
+            self._suficientes = (A.T @ A, A.T @ np.asarray(y, dtype=np.float64))
+
+    def _resolver_lineal(self) -> None:
+        """Coeficientes de lineal/ridge a partir de las sumas suficientes
+
+        Equivale a reajustar con todas las filas vistas: el intercepto no
+        se penaliza, igual que en sklearn.
+        """
+        AtA, Aty = self._suficientes
+        k = AtA.shape[0] - 1
+        n = AtA[k, k]
+        if self.modelo.fit_intercept:
+            xm, ym = AtA[k, :k] / n, Aty[k] / n
+            XtX = AtA[:k, :k] - n * np.outer(xm, xm)
+            Xty = Aty[:k] - n * xm * ym
+        else:
+            xm, ym = np.zeros(k), 0.0
+            XtX, Xty = AtA[:k, :k], Aty[:k]
+        alpha = getattr(self.modelo, "alpha", 0.0)
+        coef = np.linalg.lstsq(XtX + alpha * np.eye(k), Xty, rcond=None)[0]
+        self.modelo.coef_ = coef
+        self.modelo.intercept_ = float(ym - xm @ coef)
+
+    def actualizar(
+        self,
+        X: pd.DataFrame,
+        y: pd.Series,
+        tolerancia: float = 0.25,
+        alfa: float = 0.3,
+        arboles: int = 10,
+        historia=None,
+        max_arboles: Optional[int] = None,
+    ) -> Dict:
+        """Incorpora filas nuevas en O(filas nuevas)
+
+        Primero mide el error de las filas nuevas con el modelo actual
+        (evaluación prequential) y acumula las métricas corrientes; luego
+        actualiza: sumas suficientes exactas en lineal/ridge,
+        ``partial_fit`` en sgd y ``arboles`` estimadores más (warm start)
+        ajustados con las filas nuevas en rf/gb. Si el MSE reciente (media
+        exponencial con ``alfa`` por lote) supera al de entrenamiento en
+        más de ``tolerancia`` hay deriva: con ``historia`` (función que
+        devuelve ``(X, y)`` completos) se reentrena desde cero.
+
+        El ensamble de rf/gb nunca supera ``max_arboles`` (por defecto, el
+        doble de los árboles del último ajuste completo), así que su tamaño
+        y el costo de predecir son O(1) en la cantidad de actualizaciones.
+        En rf se conservan los árboles del ajuste completo y se descartan
+        los incrementales más viejos. Las etapas de gb no se pueden quitar:
+        al llegar al tope se reentrena con ``historia`` o, sin ella, se deja
+        de agregar etapas.
+        """
+        if not self.entrenado:
+            raise ValueError("No entrenado")
+        base = self._arboles_base
+        if base is None and self.tipo in ("rf", "gb"):
+            base = len(self.modelo.estimators_)
+        tope = None if base is None else max_arboles or 2 * base
+        if tope is not None and tope <= base:
+            raise ValueError("max_arboles debe superar los árboles del ajuste")
+        y = np.asarray(y, dtype=np.float64)
+        if not len(y):
+            raise ValueError("No hay filas nuevas")
+        X = X[self.features] if isinstance(X, pd.DataFrame) else X
+        e = y - self.predecir_lote(X)
+        self._acum += [len(y), e @ e, np.abs(e).sum(), y.sum(), y @ y]
+        mse = float(e @ e / len(y))
+        self.mse_reciente = (
+            mse
+            if self.mse_reciente is None
+            else alfa * mse + (1 - alfa) * self.mse_reciente
+        )
+        referencia = self.metricas.mse if self.metricas else np.inf
+        deriva = self.mse_reciente > (1 + tolerancia) ** 2 * referencia
+        # Las etapas de gb no se descartan: al tope solo queda reentrenar
+        lleno = self.tipo == "gb" and len(self.modelo.estimators_) + arboles > tope
+        reentrenar = historia is not None and (deriva or lleno)
+        info = {
+            "filas": len(y),
+            "rmse_lote": float(np.sqrt(mse)),
+            "rmse_reciente": float(np.sqrt(self.mse_reciente)),
+            "deriva": bool(deriva),
+            "reentrenado": bool(reentrenar),
+        }
+
+        if reentrenar:
+            X_todo, y_todo = historia()
+            self.entrenar(X_todo, y_todo)
+        else:
+            X = pd.DataFrame(np.asarray(X, dtype=np.float64), columns=self.features)
+            if self._suficientes is not None:
+                A = self._matriz_lineal(X)
+                self._suficientes = (
+                    self._suficientes[0] + A.T @ A,
+                    self._suficientes[1] + A.T @ y,
+                )
+                self._resolver_lineal()
+            elif isinstance(self.modelo, Pipeline):
+                escalador, sgd = self.modelo[0], self.modelo[-1]
+                sgd.partial_fit(escalador.transform(X), y)
+            elif not lleno:
+                self.modelo.set_params(
+                    warm_start=True,
+                    n_estimators=len(self.modelo.estimators_) + arboles,
+                )
+                self.modelo.fit(X, y)
+                if self.tipo == "rf" and len(self.modelo.estimators_) > tope:
+                    arbol = self.modelo.estimators_
+                    self.modelo.estimators_ = arbol[:base] + arbol[base - tope :]
+                # Los hiperparámetros vuelven a los del ajuste completo
+                self.modelo.set_params(
+                    warm_start=False,
+                    n_estimators=self.MODELOS[self.tipo](**self.hiper).n_estimators,
+                )
+
+        if self.tipo in ("rf", "gb"):
+            info["arboles"] = len(self.modelo.estimators_)
+        return info
+
+    def metricas_online(self) -> Optional[Metricas]:
+        """Métricas acumuladas de las filas recibidas por ``actualizar``"""
+        n, se, ae, sy, sy2 = self._acum
+        if not n:
+            return None
+        sst = sy2 - sy**2 / n
+        return Metricas(
+            mse=float(se / n),
+            rmse=float(np.sqrt(se / n)),
+            mae=float(ae / n),
+            r2=float(1 - se / sst) if sst > 0 else np.nan,
+        )
 
     def importancia(self) -> Dict[str, float]:
         if not self.entrenado:
             raise ValueError("No entrenado")
-        if hasattr(self.modelo, "feature_importances_"):
-            imp = self.modelo.feature_importances_
-        elif hasattr(self.modelo, "coef_"):
-            imp = np.abs(self.modelo.coef_)
+        modelo = self.modelo[-1] if isinstance(self.modelo, Pipeline) else self.modelo
+        if hasattr(modelo, "feature_importances_"):
+            imp = modelo.feature_importances_
+        elif hasattr(modelo, "coef_"):
+            imp = np.abs(modelo.coef_)
         else:
             raise ValueError("Sin importancia")
         return dict(zip(self.features, imp.tolist()))
 
+    def guardar(self, ruta: str) -> str:
+        """Guarda estimador, features, métricas e hiperparámetros con joblib
+
+        Sin compresión, para que ``cargar`` pueda mapear los arrays.
+        """
+        if not self.entrenado:
+            raise ValueError("No entrenado")
+        estado = {
+            "tipo": self.tipo,
+            "hiper": self.hiper,
+            "modelo": self.modelo,
+            "features": self.features,
+            "metricas": asdict(self.metricas) if self.metricas else None,
+            "residuos": self.residuos,
+            "online": (self._suficientes, self._acum, self.mse_reciente),
+            "arboles_base": self._arboles_base,
+        }
+        joblib.dump(estado, ruta)
+        return ruta
+
+    @classmethod
+    def cargar(cls, ruta: str, mmap_mode: Optional[str] = "r") -> "MLPipeline":
+        """Carga un modelo guardado con ``guardar``
+
+        ``mmap_mode`` solo aplica a los arrays numpy guardados tal cual (los
+        residuos): sklearn copia a memoria propia los nodos de los árboles de
+        rf/gb al reconstruirlos, así que cada proceso carga su copia.
+        """
+        estado = joblib.load(ruta, mmap_mode=mmap_mode)
+        pipe = cls(estado["tipo"], estado["hiper"])
+        pipe.modelo = estado["modelo"]
+        pipe.features = estado["features"]
+        pipe.residuos = estado["residuos"]
+        if estado["metricas"]:
+            pipe.metricas = Metricas(**estado["metricas"])
+        if "online" in estado:
+            suficientes, acum, pipe.mse_reciente = estado["online"]
+            pipe._acum = np.array(acum)
+            if suficientes is not None:
+                pipe._suficientes = tuple(np.array(m) for m in suficientes)
+        pipe._arboles_base = estado.get("arboles_base")
+        pipe.entrenado = True
+        return pipe
+
+
+class RegistroModelos:
+    """Registro versionado de modelos en disco
+
+    Cada nombre es un directorio con ``v0001.joblib`` más su ficha
+    ``v0001.json`` (tipo, hiperparámetros, features, métricas, fecha), que
+    permite listar sin cargar los modelos.
+    """
+
+    def __init__(self, directorio: str = "modelos"):
+        self.directorio = directorio
+
+    def _ruta(self, nombre: str, version: int, ext: str) -> str:
+        return os.path.join(self.directorio, nombre, f"v{version:04d}.{ext}")
+
+    def versiones(self, nombre: str, ext: str = "joblib") -> List[int]:
+        """Versiones publicadas (``ext="json"`` incluye las reservadas)"""
+        carpeta = os.path.join(self.directorio, nombre)
+        if not os.path.isdir(carpeta):
+            return []
+        return sorted(
+            int(f[1 : -len(ext) - 1])
+            for f in os.listdir(carpeta)
+            if f.startswith("v") and f.endswith("." + ext)
+        )
+
+    def _reservar(self, nombre: str) -> int:
+        """Reserva la siguiente versión creando su ficha en modo exclusivo"""
+        version = max(self.versiones(nombre, "json"), default=0) + 1
+        while True:
+            try:
+                with open(self._ruta(nombre, version, "json"), "x"):
+                    return version
+            except FileExistsError:
+                version += 1
+
+    def registrar(self, nombre: str, pipe: MLPipeline) -> int:
+        """Guarda ``pipe`` como nueva versión de ``nombre`` y la devuelve
+
+        Seguro entre procesos: la versión se reserva con creación exclusiva
+        de la ficha, la ficha se escribe antes que el modelo y ambos se
+        publican con ``os.replace``; una versión visible siempre tiene
+        ficha y modelo completos.
+        """
+        os.makedirs(os.path.join(self.directorio, nombre), exist_ok=True)
+        version = self._reservar(nombre)
+        ruta_ficha = self._ruta(nombre, version, "json")
+        ruta = self._ruta(nombre, version, "joblib")
+        ficha = {
+            "nombre": nombre,
+            "version": version,
+            "tipo": pipe.tipo,
+            "hiper": pipe.hiper,
+            "features": pipe.features,
+            "metricas": asdict(pipe.metricas) if pipe.metricas else None,
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+        }
+        try:
+            with open(ruta_ficha + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(ficha, f, ensure_ascii=False, indent=2, default=str)
+            os.replace(ruta_ficha + ".tmp", ruta_ficha)
+            pipe.guardar(ruta + ".tmp")
+            os.replace(ruta + ".tmp", ruta)
+        except BaseException:
+            for r in (ruta + ".tmp", ruta_ficha + ".tmp", ruta_ficha):
+                if os.path.exists(r):
+                    os.remove(r)
+            raise
+        return version
+
+    def cargar(
+        self, nombre: str, version: Optional[int] = None, mmap_mode: Optional[str] = "r"
+    ) -> MLPipeline:
+        """Carga una versión (por defecto, la última) de ``nombre``"""
+        versiones = self.versiones(nombre)
+        if not versiones:
+            raise ValueError(f"Modelo '{nombre}' no registrado")
+        version = versiones[-1] if version is None else version
+        if version not in versiones:
+            raise ValueError(f"Versión {version} de '{nombre}' no registrada")
+        return MLPipeline.cargar(self._ruta(nombre, version, "joblib"), mmap_mode)
+
+    def listar(self) -> pd.DataFrame:
+        """Fichas de todas las versiones registradas"""
+        filas = []
+        if os.path.isdir(self.directorio):
+            for nombre in sorted(os.listdir(self.directorio)):
+                for v in self.versiones(nombre):
+                    # Versiones sin ficha (p. ej. registro interrumpido) se omiten
+                    try:
+                        with open(self._ruta(nombre, v, "json"), encoding="utf-8") as f:
+                            ficha = json.load(f)
+                    except (FileNotFoundError, json.JSONDecodeError):
+                        continue
+                    filas.append(
+                        {
+                            "nombre": nombre,
+                            "version": v,
+                            "tipo": ficha["tipo"],
+                            "features": ",".join(ficha["features"]),
+                            **(ficha["metricas"] or {}),
+                            "fecha": ficha["fecha"],
+                        }
+                    )
+        return pd.DataFrame(filas)
+
 
 class PredictorDemandaPipeline:
     """Pipeline de predicción de demanda"""
@@ -99,19 +787,292 @@ class PredictorDemandaPipeline:
             }
         )
 
+    @staticmethod
+    def _generar_bloque(
+        seed: int,
+        a: int,
+        b: int,
+        dias: int,
+        intermitencia: float,
+        promociones: float,
+    ) -> np.ndarray:
+        """Demanda float32 de los SKU [a, b); cada SKU usa su propio generador
+
+        El generador del SKU i sale de ``SeedSequence(seed, spawn_key=(i,))``,
+        igual al hijo i de ``SeedSequence(seed).spawn``: la serie no depende
+        del bloque ni del proceso que la calcula.
+        """
+        t = np.arange(dias)
+        salida = np.empty((b - a, dias), dtype=np.float32)
+        for k, i in enumerate(range(a, b)):
+            rng = np.random.Generator(
+                np.random.PCG64(np.random.SeedSequence(seed, spawn_key=(i,)))
+            )
+            nivel = rng.lognormal(3.0, 1.0)
+            pendiente = rng.normal(0.0, 0.5) / dias
+            semanal = rng.uniform(0.0, 0.3)
+            anual = rng.uniform(0.0, 0.5)
+            fase = rng.uniform(0.0, 2 * np.pi, size=2)
+            media = nivel * (
+                1
+                + pendiente * t
+                + semanal * np.sin(2 * np.pi * t / 7 + fase[0])
+                + anual * np.sin(2 * np.pi * t / 365 + fase[1])
+            )
+            # Promociones: días sueltos con un aumento multiplicativo
+            promo = rng.random(dias) < promociones
+            media *= np.where(promo, 1 + rng.uniform(0.5, 2.0), 1.0)
+            demanda = rng.poisson(np.maximum(media, 0.0))
+            # SKU intermitentes: la mayoría de los días sin venta
+            if rng.random() < intermitencia:
+                demanda *= rng.random(dias) < rng.uniform(0.05, 0.4)
+            salida[k] = demanda
+        return salida
+
+    @staticmethod
+    def generar_lote(
+        n_sku: int,
+        dias: int = 1000,
+        seed: int = 0,
+        bloque: int = 1000,
+        intermitencia: float = 0.3,
+        promociones: float = 0.02,
+        n_jobs: int = 1,
+    ) -> Iterator[np.ndarray]:
+        """Itera bloques float32 (SKU × días) de demanda sintética
+
+        Cada SKU tiene nivel, tendencia, estacionalidad semanal y anual,
+        promociones y, con probabilidad ``intermitencia``, demanda
+        intermitente. El bloque k cubre los SKU [k·bloque, (k+1)·bloque).
+        Con ``n_jobs`` != 1 los bloques se generan en paralelo y salen en
+        orden, idénticos a la ejecución serial.
+        """
+        if bloque <= 0:
+            raise ValueError("bloque debe ser positivo")
+        tareas = [
+            (seed, a, min(a + bloque, n_sku), dias, intermitencia, promociones)
+            for a in range(0, n_sku, bloque)
+        ]
+        if n_jobs == 1:
+            return (PredictorDemandaPipeline._generar_bloque(*t) for t in tareas)
+        return Parallel(n_jobs=n_jobs, return_as="generator")(
+            delayed(PredictorDemandaPipeline._generar_bloque)(*t) for t in tareas
+        )
+
+    @staticmethod
+    def generar_archivo(ruta: str, n_sku: int, dias: int = 1000, **opciones) -> str:
+        """Escribe ``generar_lote`` a disco bloque por bloque
+
+        ``.npy`` guarda la matriz (SKU × días) float32 vía memmap; ``.parquet``
+        guarda formato largo (sku, dia, demanda). La memoria usada es la de
+        un bloque.
+        """
+        bloques = PredictorDemandaPipeline.generar_lote(n_sku, dias, **opciones)
+        if ruta.endswith(".npy"):
+            matriz = np.lib.format.open_memmap(
+                ruta, mode="w+", dtype=np.float32, shape=(n_sku, dias)
+            )
+            a = 0
+            for x in bloques:
+                matriz[a : a + len(x)] = x
+                a += len(x)
+            matriz.flush()
+            del matriz
+        elif ruta.endswith((".parquet", ".pq")):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            escritor, a = None, 0
+            try:
+                for x in bloques:
+                    tabla = pa.table(
+                        {
+                            "sku": np.repeat(
+                                np.arange(a, a + len(x), dtype=np.int32), dias
+                            ),
+                            "dia": np.tile(np.arange(dias, dtype=np.int32), len(x)),
+                            "demanda": x.ravel(),
+                        }
+                    )
+                    escritor = escritor or pq.ParquetWriter(ruta, tabla.schema)
+                    escritor.write_table(tabla)
+                    a += len(x)
+            finally:
+                if escritor is not None:
+                    escritor.close()
+        else:
+            raise ValueError("Formato no soportado: use .npy o .parquet")
+        return ruta
+
     @staticmethod
     def movils(serie: pd.Series, v: int = 7) -> pd.Series:
         """Promedio móvil"""
         return serie.rolling(v, min_periods=1).mean()
 
+    # Filas (series) por bloque en descomponer_lote
+    SERIES_BLOQUE = 512
+
     @staticmethod
     def descomponer(
-        serie: pd.Series, p: int = 365
+        serie: pd.Series,
+        p: Union[int, Sequence[int]] = (7, 365),
+        armonicos: Optional[int] = None,
     ) -> Tuple[pd.Series, pd.Series, pd.Series]:
-        """Descompone en tendencia, estacionalidad, residuo"""
-        t = serie.rolling(p // 4, min_periods=1).mean()
-        return (
-            t,
-            serie - t,
-            serie - t - (serie - t),
+        """Descompone en tendencia, estacionalidad, residuo
+
+        ``p`` es un período o varios; ver ``descomponer_lote``. Los
+        períodos sin dos ciclos completos se omiten con aviso (su
+        componente queda en cero) y falla solo si no queda ninguno.
+        """
+        periodos = (p,) if np.isscalar(p) else tuple(p)
+        if len(serie) < 2 * min(periodos):
+            raise ValueError(
+                f"La serie tiene {len(serie)} días: se necesitan al menos "
+                f"{2 * min(periodos)} para estimar el período {min(periodos)}"
+            )
+        partes = PredictorDemandaPipeline.descomponer_lote(
+            serie.to_numpy(dtype=np.float64)[None, :],
+            periodos=periodos,
+            armonicos=armonicos,
+        )
+        return tuple(
+            pd.Series(partes[k][0], index=serie.index, name=k)
+            for k in ("tendencia", "estacional", "residuo")
         )
+
+    @staticmethod
+    def descomponer_lote(
+        Y: np.ndarray,
+        periodos: Sequence[int] = (7, 365),
+        armonicos: Optional[int] = None,
+        ventana: Optional[int] = None,
+        iteraciones: int = 2,
+    ) -> Dict[str, np.ndarray]:
+        """Descomposición aditiva de muchas series (series × tiempo) a la vez
+
+        La tendencia es una media móvil centrada de ``ventana`` días (por
+        defecto, el mayor período estimable). Cada estacionalidad es el
+        perfil promedio al plegar la serie sin tendencia por su período,
+        centrado en cero y, con ``armonicos``, suavizado por FFT dejando
+        solo esa cantidad de armónicos. Solo se pliegan los días con la
+        ventana de tendencia completa: en los bordes la media recortada
+        arrastra estacionalidad. Las componentes se reestiman
+        ``iteraciones`` veces (backfitting) y la tendencia final, con recta
+        local en los bordes, se calcula sobre la serie desestacionalizada.
+        Un período con menos de dos ciclos completos no se estima: queda en
+        cero con un aviso. Tolera NaN. Devuelve tendencia, estacional
+        (suma), estacional_<p> y residuo.
+        """
+        Y = np.atleast_2d(np.asarray(Y, dtype=np.float64))
+        m, T = Y.shape
+        periodos = sorted({int(p) for p in periodos})
+        if any(p < 2 for p in periodos):
+            raise ValueError("Los períodos deben ser al menos 2")
+        if iteraciones < 1:
+            raise ValueError("iteraciones debe ser al menos 1")
+        validos = [p for p in periodos if T >= 2 * p]
+        omitidos = [p for p in periodos if T < 2 * p]
+        if omitidos:
+            warnings.warn(
+                f"Series de {T} días: los períodos {omitidos} necesitan dos "
+                "ciclos completos y su estacionalidad queda en cero",
+                stacklevel=2,
+            )
+        if ventana is None:
+            ventana = max(validos) if validos else max(1, min(max(periodos), T) // 4)
+        h = ventana // 2
+
+        salida = {k: np.empty_like(Y) for k in ("tendencia", "estacional", "residuo")}
+        for p in periodos:
+            salida[f"estacional_{p}"] = np.zeros_like(Y)
+        for a in range(0, m, PredictorDemandaPipeline.SERIES_BLOQUE):
+            b = slice(a, a + PredictorDemandaPipeline.SERIES_BLOQUE)
+            y = Y[b]
+            estacional = {p: np.zeros_like(y) for p in validos}
+            total = np.zeros_like(y)
+            for _ in range(iteraciones):
+                tendencia = PredictorDemandaPipeline._media_centrada(y - total, ventana)
+                sin_tendencia = y - tendencia
+                sin_tendencia[:, :h] = np.nan
+                sin_tendencia[:, T - h :] = np.nan
+                for p in validos:
+                    total -= estacional[p]
+                    estacional[p] = PredictorDemandaPipeline._perfil(
+                        sin_tendencia - total, p, armonicos
+                    )
+                    total += estacional[p]
+            tendencia = PredictorDemandaPipeline._media_centrada(
+                y - total, ventana, lineal=True
+            )
+            salida["tendencia"][b] = tendencia
+            salida["estacional"][b] = total
+            salida["residuo"][b] = y - tendencia - total
+            for p in validos:
+                salida[f"estacional_{p}"][b] = estacional[p]
+        return salida
+
+    @staticmethod
+    def _media_centrada(Y: np.ndarray, w: int, lineal: bool = False) -> np.ndarray:
+        """Media móvil centrada por fila (2×w si w es par)
+
+        Con ``lineal`` cada ventana ajusta una recta por mínimos cuadrados
+        y la evalúa en su centro: con la ventana completa es la media móvil;
+        en los bordes, donde la ventana queda recortada, sigue la pendiente
+        local en vez de sesgarse hacia el interior.
+        """
+        T = Y.shape[1]
+        h = w // 2
+        t = np.arange(T, dtype=np.float64)
+        presente = ~np.isnan(Y)
+        completa = presente.all()
+        y = Y if completa else np.where(presente, Y, 0.0)
+        # Sin NaN las sumas de 1, t y t² son iguales en todas las filas
+        base = np.ones((1, T)) if completa else presente
+
+        def sumas(momentos: List[np.ndarray]) -> np.ndarray:
+            # Sumas acumuladas con bordes repetidos: cada ventana recortada
+            # a [0, T) es una resta de dos slices, sin indexado por arrays
+            acum = np.zeros((len(momentos), len(momentos[0]), T + 2 * h + 3))
+            for k, v in enumerate(momentos):
+                np.cumsum(v, axis=1, out=acum[k, :, h + 2 : T + h + 2])
+            acum[:, :, T + h + 2 :] = acum[:, :, T + h + 1 : T + h + 2]
+
+            def ventana(desde: int, hasta: int) -> np.ndarray:
+                lo = slice(h + 1 + desde, h + 1 + desde + T)
+                hi = slice(h + 2 + hasta, h + 2 + hasta + T)
+                return acum[:, :, hi] - acum[:, :, lo]
+
+            if w % 2:
+                return ventana(-h, h)
+            return ventana(-h, h - 1) + ventana(-h + 1, h)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            if not lineal:
+                return sumas([y])[0] / sumas([base])[0]
+            n, st, stt = sumas([base, base * t, base * t**2])
+            sy, sty = sumas([y, y * t])
+            det = n * stt - st**2
+            # Sumas enteras en t: det es exactamente 0 con un solo punto
+            pendiente = np.where(det > 0, (n * sty - st * sy) / det, 0.0)
+            return (sy + pendiente * (n * t - st)) / n
+
+    @staticmethod
+    def _perfil(D: np.ndarray, p: int, armonicos: Optional[int]) -> np.ndarray:
+        """Perfil estacional por plegado en ciclos de ``p``, expandido a T"""
+        m, T = D.shape
+        ciclos = -(-T // p)
+        plegado = np.full((m, ciclos * p), np.nan)
+        plegado[:, :T] = D
+        plegado = plegado.reshape(m, ciclos, p)
+        presente = ~np.isnan(plegado)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            perfil = np.where(presente, plegado, 0.0).sum(axis=1) / presente.sum(axis=1)
+        perfil = np.nan_to_num(perfil)
+        if armonicos is None:
+            perfil -= perfil.mean(axis=1, keepdims=True)
+        else:
+            F = np.fft.rfft(perfil, axis=1)
+            F[:, 0] = 0
+            F[:, armonicos + 1 :] = 0
+            perfil = np.fft.irfft(F, n=p, axis=1)
+        return np.tile(perfil, ciclos)[:, :T]
@@ -0,0 +1,255 @@
+"""
+Multi-Serie Pipeline - Pronóstico de Demanda por SKU
+
+Ajusta un modelo por SKU, por cluster de SKU o uno global sobre un
+DataFrame largo (sku, fecha, demanda), en paralelo, y escribe los
+pronósticos a disco por bloques.
+"""
+
+from typing import Dict, Optional, Tuple, Union
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+
+from src.pipelines.ml import MLPipeline
+
+
+def _calendario(dias: np.ndarray, origen: pd.Timestamp) -> np.ndarray:
+    """Features de calendario (dia, mes, trimestre, dia_semana) desde el día"""
+    fechas = origen + pd.to_timedelta(dias, unit="D")
+    return np.column_stack(
+        [dias, fechas.month, fechas.quarter, fechas.dayofweek]
+    ).astype(np.float64)
+
+
+def _ajustar_bloque(
+    tipo: str,
+    hiper: Dict,
+    F: np.ndarray,
+    y: np.ndarray,
+    dias: np.ndarray,
+    offsets: np.ndarray,
+    grupos: list,
+    normalizar: bool,
+    horizonte: int,
+    validar: bool,
+    origen: pd.Timestamp,
+) -> Tuple[np.ndarray, ...]:
+    """Ajusta y pronostica los grupos [j0, j1) de SKU de un bloque"""
+    sku_fut, dia_fut, pred_fut, metricas = [], [], [], []
+    pasos = np.arange(1, horizonte + 1)
+    for j0, j1 in grupos:
+        r0, r1 = offsets[j0], offsets[j1]
+        largo = np.diff(offsets[j0 : j1 + 1])
+        locales = offsets[j0:j1] - r0
+        Fg, yg = F[r0:r1], y[r0:r1]
+
+        nivel = np.ones(j1 - j0)
+        if normalizar:
+            nivel = np.add.reduceat(yg, locales) / largo
+            nivel = np.where(nivel > 0, nivel, 1.0)
+        escala = np.repeat(nivel, largo)
+        yn = yg / escala
+
+        error = np.full((j1 - j0, 2), np.nan)
+        if validar:
+            # Los últimos días de cada SKU (a lo sumo ``horizonte``) son prueba
+            n_test = np.minimum(horizonte, largo - 1)
+            fin = np.repeat(locales + largo, largo)
+            prueba = np.arange(r1 - r0) >= fin - np.repeat(n_test, largo)
+            if prueba.any() and not prueba.all():
+                modelo = MLPipeline.MODELOS[tipo](**hiper)
+                modelo.fit(Fg[~prueba], yn[~prueba])
+                e = np.zeros(r1 - r0)
+                e[prueba] = (modelo.predict(Fg[prueba]) - yn[prueba]) * escala[prueba]
+                with np.errstate(invalid="ignore"):
+                    error[:, 0] = np.sqrt(np.add.reduceat(e**2, locales) / n_test)
+                    error[:, 1] = np.add.reduceat(np.abs(e), locales) / n_test
+
+        modelo = MLPipeline.MODELOS[tipo](**hiper)
+        modelo.fit(Fg, yn)
+        ultimo = dias[r0:r1][locales + largo - 1]
+        futuros = (ultimo[:, None] + pasos).ravel()
+        pred = modelo.predict(_calendario(futuros, origen)) * np.repeat(
+            nivel, horizonte
+        )
+
+        codigos = np.arange(j0, j1)
+        sku_fut.append(np.repeat(codigos, horizonte))
+        dia_fut.append(futuros)
+        pred_fut.append(pred)
+        metricas.append(np.column_stack([codigos, largo, error]))
+    return (
+        np.concatenate(sku_fut),
+        np.concatenate(dia_fut),
+        np.concatenate(pred_fut),
+        np.concatenate(metricas),
+    )
+
+
+class MultiSeriePipeline:
+    """Pronóstico de demanda para muchos SKU en paralelo
+
+    ``modo`` es "sku" (un modelo por SKU), "cluster" (un modelo por grupo
+    de ``clusters``, un mapeo sku -> cluster) o "global" (un solo modelo
+    con todos los SKU). Los modelos agrupados ajustan la demanda dividida
+    por el promedio de cada SKU y la reescalan al pronosticar.
+    """
+
+    MODOS = ("sku", "cluster", "global")
+
+    def __init__(
+        self,
+        modelo: str = "ridge",
+        hiper: Optional[Dict] = None,
+        modo: str = "sku",
+        clusters: Optional[Union[Dict, pd.Series]] = None,
+        horizonte: int = 30,
+        validar: bool = True,
+        n_jobs: int = -1,
+        bloque: int = 500,
+    ):
+        if modelo not in MLPipeline.MODELOS:
+            raise ValueError(f"Modelo '{modelo}' no disponible")
+        if modo not in self.MODOS:
+            raise ValueError(f"modo debe ser uno de {self.MODOS}")
+        if modo == "cluster" and clusters is None:
+            raise ValueError("El modo 'cluster' requiere clusters")
+        self.modelo = modelo
+        self.hiper = dict(hiper or {})
+        self.modo = modo
+        self.clusters = None if clusters is None else pd.Series(clusters)
+        self.horizonte = horizonte
+        self.validar = validar
+        self.n_jobs = n_jobs
+        self.bloque = bloque
+
+    def _ordenar(self, datos: pd.DataFrame, sku: str, fecha: str, demanda: str):
+        """Ordena una sola vez por (grupo, sku, fecha) y arma los offsets"""
+        codigos, skus = pd.factorize(datos[sku], sort=True)
+        fechas = pd.to_datetime(datos[fecha])
+        origen = fechas.min()
+        dias = ((fechas - origen) // pd.Timedelta(days=1)).to_numpy(np.int64)
+
+        if self.modo == "sku":
+            grupo_sku = np.arange(len(skus))
+        elif self.modo == "global":
+            grupo_sku = np.zeros(len(skus), dtype=np.int64)
+        else:
+            grupo_sku = pd.factorize(self.clusters.reindex(skus), sort=True)[0]
+            if (grupo_sku < 0).any():
+                raise ValueError("Hay SKU sin cluster asignado")
+        # Renumera los SKU para que los de un mismo grupo queden contiguos
+        perm = np.lexsort((np.arange(len(skus)), grupo_sku))
+        nuevo = np.empty_like(perm)
+        nuevo[perm] = np.arange(len(perm))
+        codigos = nuevo[codigos]
+        skus, grupo_sku = skus[perm], grupo_sku[perm]
+
+        orden = np.lexsort((dias, codigos))
+        y = datos[demanda].to_numpy(dtype=np.float64)[orden]
+        dias = dias[orden]
+        offsets = np.r_[0, np.cumsum(np.bincount(codigos, minlength=len(skus)))]
+        limites = np.flatnonzero(np.r_[True, grupo_sku[1:] != grupo_sku[:-1]])
+        grupos = list(zip(limites, np.r_[limites[1:], len(skus)]))
+        return skus, origen, dias, y, offsets, grupos
+
+    def _tareas(self, grupos: list) -> list:
+        """Reparte los grupos enteros en tareas de al menos ``bloque`` SKU"""
+        tareas, actual, tam = [], [], 0
+        for j0, j1 in grupos:
+            actual.append((j0, j1))
+            tam += j1 - j0
+            if tam >= self.bloque:
+                tareas.append(actual)
+                actual, tam = [], 0
+        if actual:
+            tareas.append(actual)
+        return tareas
+
+    def pronosticar(
+        self,
+        datos: pd.DataFrame,
+        salida: Optional[str] = None,
+        sku: str = "sku",
+        fecha: str = "fecha",
+        demanda: str = "demanda",
+    ) -> Tuple[Optional[pd.DataFrame], pd.DataFrame]:
+        """Ajusta y pronostica ``horizonte`` días por SKU
+
+        ``datos`` es largo (una fila por SKU y fecha diaria). Con ``salida``
+        (.csv o .parquet) los pronósticos se escriben por bloques a medida
+        que terminan las tareas y se devuelve ``None`` en su lugar; si no,
+        se devuelve el DataFrame (sku, fecha, pronostico). Siempre devuelve
+        las métricas por SKU (filas, rmse y mae sobre los últimos días).
+        """
+        skus, origen, dias, y, offsets, grupos = self._ordenar(
+            datos, sku, fecha, demanda
+        )
+        F = _calendario(dias, origen)
+        tareas = self._tareas(grupos)
+
+        resultados = Parallel(n_jobs=self.n_jobs, return_as="generator")(
+            delayed(_ajustar_bloque)(
+                self.modelo,
+                self.hiper,
+                F,
+                y,
+                dias,
+                offsets,
+                t,
+                self.modo != "sku",
+                self.horizonte,
+                self.validar,
+                origen,
+            )
+            for t in tareas
+        )
+
+        parquet = salida is not None and salida.endswith((".parquet", ".pq"))
+        if parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+        escritor, partes, metricas = None, [], []
+        try:
+            for codigos, futuros, pred, met in resultados:
+                bloque = pd.DataFrame(
+                    {
+                        sku: skus.take(codigos),
+                        fecha: origen + pd.to_timedelta(futuros, unit="D"),
+                        "pronostico": pred,
+                    }
+                )
+                if salida is None:
+                    partes.append(bloque)
+                elif parquet:
+                    tabla = pa.Table.from_pandas(bloque, preserve_index=False)
+                    escritor = escritor or pq.ParquetWriter(salida, tabla.schema)
+                    escritor.write_table(tabla)
+                else:
+                    primero = not metricas
+                    bloque.to_csv(
+                        salida,
+                        mode="w" if primero else "a",
+                        header=primero,
+                        index=False,
+                    )
+                metricas.append(met)
+        finally:
+            if escritor is not None:
+                escritor.close()
+
+        met = np.concatenate(metricas) if metricas else np.empty((0, 4))
+        tabla = pd.DataFrame(
+            {
+                sku: skus.take(met[:, 0].astype(np.int64)),
+                "filas": met[:, 1].astype(np.int64),
+                "rmse": met[:, 2],
+                "mae": met[:, 3],
+            }
+        )
+        if salida is not None:
+            return None, tabla
+        pronostico = pd.concat(partes, ignore_index=True) if partes else None
+        return pronostico, tabla
@@ -0,0 +1,296 @@
+"""
+Paralelo Pipeline - Ejecución por Bloques en Varios Procesos
+
+Reparte un catálogo en bloques de filas, lo publica en memoria compartida
+(``multiprocessing.shared_memory``) y ejecuta los modelos EOQ y ABC de
+``GestorStockPipeline`` en un pool de procesos. Los workers leen y escriben
+directamente sobre los bloques compartidos, sin copiar datos por pickle, y
+el resultado es idéntico al de la ejecución en un solo proceso.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple, Union
+import numpy as np
+import pandas as pd
+
+from src.pipelines.business import ArrayLike, EOQLote, GestorStockPipeline
+
+# Bloque compartido: (nombre, forma, dtype)
+Spec = Tuple[str, Tuple[int, ...], str]
+
+MODELOS = {
+    "clasico": (
+        GestorStockPipeline.eoq_clasico_lote,
+        {"D": None, "C1": None, "C3": None, "C4": 0, "lead_time": 0},
+    ),
+    "faltantes": (
+        GestorStockPipeline.eoq_faltantes_lote,
+        {"D": None, "C1": None, "C2": None, "C3": None, "C4": 0},
+    ),
+    "produccion": (
+        GestorStockPipeline.eoq_produccion_lote,
+        {"D": None, "C1": None, "C3": None, "d": 0, "p": 0, "C4": 0},
+    ),
+}
+
+
+def _vista(shm: shared_memory.SharedMemory, spec: Spec) -> np.ndarray:
+    return np.ndarray(spec[1], dtype=np.dtype(spec[2]), buffer=shm.buf)
+
+
+def _ejecutar(funcion, specs: List[Spec], args: tuple):
+    """Adjunta los bloques compartidos y llama a ``funcion`` con sus vistas"""
+    bloques = [shared_memory.SharedMemory(name=s[0]) for s in specs]
+    try:
+        return funcion(*[_vista(m, s) for m, s in zip(bloques, specs)], *args)
+    finally:
+        for m in bloques:
+            try:
+                m.close()
+            except BufferError:
+                # Una excepción retiene las vistas; se liberan al recolectarlas
+                pass
+
+
+def _eoq_bloque(entrada, salida, codigo, modelo, a, b, dias):
+    lote = MODELOS[modelo][0](*entrada[:, a:b], dias=dias)
+    salida[:, a:b] = lote.datos.T
+    codigo[a:b] = lote.codigo
+
+
+def _descuentos_bloque(por_sku, tramos, offsets, salida, codigo, costo, a, b):
+    o = offsets[a : b + 1]
+    lote, costo_valido = GestorStockPipeline.eoq_descuentos_lote(
+        *por_sku[:, a:b], *tramos[:, o[0] : o[-1]], offsets=o - o[0]
+    )
+    salida[:, a:b] = lote.datos.T
+    codigo[a:b] = lote.codigo
+    costo[o[0] : o[-1]] = costo_valido
+
+
+def _orden_bloque(valores, orden, a, b):
+    orden[a:b] = a + np.argsort(-valores[a:b], kind="stable")
+
+
+def _abc_grupos_bloque(valores, grupos, filas, frac, codigos, a, b, cortes):
+    f = filas[a:b]
+    for k in range(len(valores)):
+        frac[k, f], codigos[k, f] = GestorStockPipeline._abc_segmentado(
+            valores[k, f], grupos[f], cortes
+        )
+
+
+class _Memoria:
+    """Bloques de memoria compartida creados por el proceso principal"""
+
+    def __init__(self):
+        self.bloques: Dict[str, shared_memory.SharedMemory] = {}
+
+    def __enter__(self) -> "_Memoria":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        for m in self.bloques.values():
+            try:
+                m.close()
+            except BufferError:
+                pass
+            m.unlink()
+        self.bloques.clear()
+
+    def vacio(self, forma: Tuple[int, ...], dtype) -> Spec:
+        dtype = np.dtype(dtype)
+        nbytes = int(np.prod(forma)) * dtype.itemsize
+        m = shared_memory.SharedMemory(create=True, size=max(nbytes, 1))
+        self.bloques[m.name] = m
+        return (m.name, tuple(forma), dtype.str)
+
+    def crear(self, valores: np.ndarray) -> Spec:
+        valores = np.asarray(valores)
+        spec = self.vacio(valores.shape, valores.dtype)
+        _vista(self.bloques[spec[0]], spec)[...] = valores
+        return spec
+
+    def leer(self, spec: Spec) -> np.ndarray:
+        return _vista(self.bloques[spec[0]], spec).copy()
+
+
+class ParaleloPipeline:
+    """Ejecuta GestorStockPipeline por bloques en un pool de procesos
+
+    ``n_workers`` fija la cantidad de procesos (por defecto, todos los
+    núcleos) y ``bloque`` las filas por tarea. Con un solo worker o un solo
+    bloque todo corre en el proceso actual. Se usa como context manager
+    para cerrar el pool al terminar.
+    """
+
+    def __init__(self, n_workers: Optional[int] = None, bloque: int = 250_000):
+        if bloque <= 0:
+            raise ValueError("bloque debe ser positivo")
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.bloque = int(bloque)
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def __enter__(self) -> "ParaleloPipeline":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.cerrar()
+
+    def cerrar(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def _cortes(self, limites: np.ndarray) -> List[Tuple[int, int]]:
+        """Tramos [a, b) de ~``bloque`` filas que solo cortan en ``limites``"""
+        limites = np.asarray(limites, dtype=np.int64)
+        n = int(limites[-1])
+        objetivos = np.arange(self.bloque, n, self.bloque)
+        cortes = np.unique(
+            np.r_[0, limites[np.searchsorted(limites, objetivos)], n]
+        ).tolist()
+        return list(zip(cortes[:-1], cortes[1:]))
+
+    def _mapear(self, funcion, specs: List[Spec], tareas: List[tuple]) -> None:
+        if self.n_workers == 1 or len(tareas) <= 1:
+            for args in tareas:
+                _ejecutar(funcion, specs, args)
+            return
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.n_workers)
+        futuros = [
+            self._pool.submit(_ejecutar, funcion, specs, args) for args in tareas
+        ]
+        for f in futuros:
+            f.result()
+
+    def eoq_lote(
+        self, datos: pd.DataFrame, modelo: str = "clasico", dias: int = 365
+    ) -> EOQLote:
+        """Versión por bloques de ``eoq_<modelo>_lote`` sobre un DataFrame"""
+        if modelo not in MODELOS:
+            raise ValueError(f"Modelo '{modelo}' no disponible")
+        _, columnas = MODELOS[modelo]
+        n = len(datos)
+        entrada = np.empty((len(columnas), n))
+        for j, v in enumerate(GestorStockPipeline._columnas(datos, columnas)):
+            entrada[j] = v
+        campos = EOQLote.CAMPOS[modelo]
+
+        with _Memoria() as mem:
+            specs = [
+                mem.crear(entrada),
+                mem.vacio((len(campos), n), np.float64),
+                mem.vacio((n,), np.uint8),
+            ]
+            del entrada
+            tareas = [(modelo, a, b, dias) for a, b in self._cortes(np.arange(n + 1))]
+            self._mapear(_eoq_bloque, specs, tareas)
+            salida, codigo = mem.leer(specs[1]), mem.leer(specs[2])
+
+        lote = EOQLote(modelo, n, datos.index)
+        lote.datos = salida.T
+        lote.marcar(codigo)
+        return lote
+
+    def eoq_descuentos_lote(
+        self,
+        D: ArrayLike,
+        C3: ArrayLike,
+        i: ArrayLike,
+        precios: np.ndarray,
+        minimos: Optional[np.ndarray] = None,
+        maximos: Optional[np.ndarray] = None,
+        offsets: Optional[np.ndarray] = None,
+    ) -> Tuple[EOQLote, np.ndarray]:
+        """Versión por bloques de ``eoq_descuentos_lote``; corta entre SKU"""
+        precios, minimos, maximos, offsets = GestorStockPipeline._tramos_csr(
+            precios, minimos, maximos, offsets
+        )
+        n = len(offsets) - 1
+        por_sku = np.empty((3, n))
+        por_sku[:] = GestorStockPipeline._broadcast(D, C3, i)
+        campos = EOQLote.CAMPOS["descuentos"]
+
+        with _Memoria() as mem:
+            specs = [
+                mem.crear(por_sku),
+                mem.crear(np.stack([precios, minimos, maximos])),
+                mem.crear(offsets),
+                mem.vacio((len(campos), n), np.float64),
+                mem.vacio((n,), np.uint8),
+                mem.vacio((len(precios),), np.float64),
+            ]
+            tareas = self._cortes(np.arange(n + 1))
+            self._mapear(_descuentos_bloque, specs, tareas)
+            salida, codigo, costo = (mem.leer(s) for s in specs[3:])
+
+        lote = EOQLote("descuentos", n)
+        lote.datos = salida.T
+        lote.marcar(codigo)
+        return lote, costo
+
+    def orden_abc(self, valores: ArrayLike) -> np.ndarray:
+        """Orden descendente estable de ``valores``, igual a ``argsort(-v)``
+
+        Cada worker ordena su bloque y el proceso principal intercala los
+        tramos ya ordenados; el desempate por posición se conserva.
+        """
+        valores = np.asarray(valores, dtype=np.float64)
+        n = len(valores)
+        with _Memoria() as mem:
+            specs = [mem.crear(valores), mem.vacio((n,), np.int64)]
+            self._mapear(_orden_bloque, specs, self._cortes(np.arange(n + 1)))
+            parcial = mem.leer(specs[1])
+        return parcial[np.argsort(-valores[parcial], kind="stable")]
+
+    def abc(
+        self,
+        data: pd.DataFrame,
+        col: str,
+        umbral_a: float = 0.8,
+        umbral_b: float = 0.95,
+        copiar: bool = True,
+        total: Optional[float] = None,
+    ) -> Tuple:
+        """Versión por bloques de ``GestorStockPipeline.abc``"""
+        orden = self.orden_abc(data[col].to_numpy(dtype=np.float64))
+        return GestorStockPipeline.abc(
+            data, col, umbral_a, umbral_b, copiar, total, orden=orden
+        )
+
+    def abc_grupos(
+        self,
+        data: pd.DataFrame,
+        criterios: Union[str, List[str]],
+        by: Optional[Union[str, List[str]]] = None,
+        umbral_a: float = 0.8,
+        umbral_b: float = 0.95,
+    ) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """Versión por bloques de ``abc_grupos``; cada bloque son grupos enteros"""
+        criterios = [criterios] if isinstance(criterios, str) else list(criterios)
+        cortes = GestorStockPipeline._umbrales_abc(umbral_a, umbral_b)
+        grupos, claves = GestorStockPipeline._grupos_abc(data, by)
+        valores = data[criterios].to_numpy(dtype=np.float64).T
+        filas = np.argsort(grupos, kind="stable")
+        limites = np.r_[0, np.cumsum(np.bincount(grupos, minlength=len(claves)))]
+        n, k = len(data), len(criterios)
+
+        with _Memoria() as mem:
+            specs = [
+                mem.crear(valores),
+                mem.crear(grupos),
+                mem.crear(filas),
+                mem.vacio((k, n), np.float64),
+                mem.vacio((k, n), np.int8),
+            ]
+            tareas = [(a, b, cortes) for a, b in self._cortes(limites)]
+            self._mapear(_abc_grupos_bloque, specs, tareas)
+            frac, codigos = mem.leer(specs[3]), mem.leer(specs[4])
+
+        return GestorStockPipeline._abc_grupos_frame(
+            data.index, criterios, list(zip(frac, codigos)), grupos, claves
+        )
@@ -0,0 +1,271 @@
+"""
+Portafolio Pipeline - Recálculo Incremental del Catálogo
+
+Mantiene entradas y resultados del catálogo y recalcula solo lo que cambió.
+"""
+
+from typing import Dict, Optional, Union
+import numpy as np
+import pandas as pd
+
+from src.pipelines.business import EOQLote, GestorStockPipeline
+from src.pipelines.reposicion import ReposicionConjuntaPipeline
+
+
+class PortafolioPipeline:
+    """Portafolio persistente con seguimiento de filas modificadas"""
+
+    ENTRADAS_EOQ = {"D": None, "C1": None, "C3": None, "C4": 0, "lead_time": 0}
+
+    def __init__(
+        self,
+        datos: pd.DataFrame,
+        clave: Optional[str] = None,
+        abc: Optional[str] = None,
+        grupo_abc: Optional[str] = None,
+        proveedor: Optional[str] = None,
+        C3_grupo: Union[float, dict, pd.Series, None] = None,
+        umbral_a: float = 0.8,
+        umbral_b: float = 0.95,
+        dias: int = 365,
+    ):
+        """Calcula el portafolio completo una vez
+
+        ``datos`` trae D, C1, C3 (y opcionalmente C4, lead_time); ``clave``
+        es la columna que identifica el SKU (por defecto, el índice). Con
+        ``abc`` se clasifica por esa columna, por grupo si hay
+        ``grupo_abc``. Con ``proveedor`` y ``C3_grupo`` se resuelve la
+        reposición conjunta, usando la columna ``C3_item`` si existe.
+        """
+        if proveedor is not None and C3_grupo is None:
+            raise ValueError("La reposición conjunta requiere C3_grupo")
+        self.datos = datos.set_index(clave) if clave else datos.copy()
+        if not self.datos.index.is_unique:
+            raise ValueError("La clave del portafolio debe ser única")
+        self.abc_col = abc
+        self.grupo_abc = grupo_abc
+        self.proveedor = proveedor
+        self.C3_grupo = C3_grupo
+        self.cortes = GestorStockPipeline._umbrales_abc(umbral_a, umbral_b)
+        self.dias = dias
+
+        n = len(self.datos)
+        self.eoq = EOQLote("clasico", n, self.datos.index)
+        self.pct_acum = np.full(n, np.nan)
+        self.clase = np.full(n, -1, dtype=np.int8)
+        self.jrp = pd.DataFrame(
+            index=self.datos.index,
+            columns=["k", "Q_conjunto", "ciclo_conjunto_dias"],
+            dtype=np.float64,
+        )
+        self.jrp_grupos: Optional[pd.DataFrame] = None
+
+        self._indexar()
+        todas = np.arange(n)
+        self._calcular_eoq(todas)
+        if self.abc_col:
+            self._calcular_abc(np.arange(len(self._abc[1]) - 1))
+        if self.proveedor:
+            self._calcular_jrp(np.arange(len(self._jrp[1]) - 1))
+
+    @staticmethod
+    def _indice_grupos(etiquetas: Optional[np.ndarray], n: int):
+        """(códigos, inicios, orden, claves): filas del grupo g en orden[inicios[g]:inicios[g+1]]"""
+        if etiquetas is None:
+            return np.zeros(n, dtype=np.int64), np.array([0, n]), np.arange(n), None
+        codigos, claves = pd.factorize(etiquetas, use_na_sentinel=False)
+        orden = np.argsort(codigos, kind="stable")
+        inicios = np.searchsorted(codigos[orden], np.arange(len(claves) + 1))
+        return codigos, inicios, orden, claves
+
+    def _indexar(self) -> None:
+        """Reconstruye los índices de grupo (solo ante cambios estructurales)"""
+        n = len(self.datos)
+        etiquetas = self.datos[self.grupo_abc].to_numpy() if self.grupo_abc else None
+        self._abc = self._indice_grupos(etiquetas, n)
+        if self.proveedor:
+            self._jrp = self._indice_grupos(self.datos[self.proveedor].to_numpy(), n)
+
+    def _filas(self, indice: tuple, grupos: np.ndarray) -> np.ndarray:
+        _, inicios, orden, _ = indice
+        if len(grupos) == 0:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([orden[inicios[g] : inicios[g + 1]] for g in grupos])
+
+    def _calcular_eoq(self, filas: np.ndarray) -> None:
+        sub = self.datos.iloc[filas]
+        D, C1, C3, C4, L = GestorStockPipeline._columnas(sub, self.ENTRADAS_EOQ)
+        lote = GestorStockPipeline.eoq_clasico_lote(D, C1, C3, C4, L, self.dias)
+        self.eoq.datos[filas] = lote.datos
+        self.eoq.codigo[filas] = lote.codigo
+        self.eoq.valido[filas] = lote.valido
+
+    def _calcular_abc(self, grupos: np.ndarray) -> None:
+        filas = self._filas(self._abc, grupos)
+        valores = self.datos[self.abc_col].to_numpy(dtype=np.float64)[filas]
+        frac, codigos = GestorStockPipeline._abc_segmentado(
+            valores, self._abc[0][filas], self.cortes
+        )
+        self.pct_acum[filas] = frac * 100
+        self.clase[filas] = codigos
+
+    def _calcular_jrp(self, grupos: np.ndarray) -> None:
+        filas = self._filas(self._jrp, grupos)
+        if self.jrp_grupos is not None:
+            self.jrp_grupos = self.jrp_grupos.drop(
+                self._jrp[3][grupos], errors="ignore"
+            )
+        if filas.size == 0:
+            return
+        sub = self.datos.iloc[filas]
+        C3_item = sub["C3_item"] if "C3_item" in sub.columns else 0.0
+        items, por_grupo = ReposicionConjuntaPipeline.resolver(
+            sub[self.proveedor].to_numpy(),
+            sub["D"],
+            sub["C1"],
+            C3_item,
+            self.C3_grupo,
+            dias=self.dias,
+        )
+        self.jrp.iloc[filas] = items[["k", "Q", "ciclo_dias"]].to_numpy(np.float64)
+        if self.jrp_grupos is None:
+            self.jrp_grupos = por_grupo
+        else:
+            self.jrp_grupos = pd.concat([self.jrp_grupos, por_grupo])
+
+    def resultados(self) -> pd.DataFrame:
+        """Vista combinada: EOQ, clase ABC y reposición conjunta por SKU"""
+        res = self.eoq.to_frame()
+        if self.abc_col:
+            res["pct_acum"] = self.pct_acum
+            res["clase"] = pd.Categorical.from_codes(
+                self.clase, categories=list(GestorStockPipeline.CLASES_ABC)
+            )
+        if self.proveedor:
+            res = res.join(self.jrp)
+        return res
+
+    def actualizar(self, delta: pd.DataFrame) -> Dict:
+        """Aplica un delta (indexado por clave) y recalcula solo lo afectado
+
+        Las claves nuevas se agregan al portafolio. Se recalcula el EOQ de
+        las filas cuyos valores cambiaron, el ABC de los grupos donde cambió
+        algún valor o pertenencia y la reposición conjunta de los
+        proveedores afectados. Devuelve las claves modificadas, los grupos
+        recalculados y los cambios de Q* y de clase ABC.
+        """
+        desconocidas = set(delta.columns) - set(self.datos.columns)
+        if desconocidas:
+            raise ValueError(
+                f"Columnas desconocidas en el delta: {sorted(desconocidas)}"
+            )
+        nuevas = delta.index.difference(self.datos.index)
+        existentes = delta.drop(nuevas)
+
+        pos = self.datos.index.get_indexer(existentes.index)
+        cambio = np.zeros(len(pos), dtype=bool)
+        columnas_cambiadas = set()
+        for c in existentes.columns:
+            antes = self.datos[c].to_numpy()[pos]
+            despues = existentes[c].to_numpy()
+            distinto = ~((antes == despues) | (pd.isna(antes) & pd.isna(despues)))
+            if distinto.any():
+                columnas_cambiadas.add(c)
+                cambio |= distinto
+        pos, existentes = pos[cambio], existentes[cambio]
+
+        antes_Q = self.eoq["Q_optimo"][pos].copy()
+        antes_clase = self.clase.copy() if self.abc_col else None
+        grupos_abc = self._grupos_de(self._abc, pos) if self.abc_col else set()
+        grupos_jrp = self._grupos_de(self._jrp, pos) if self.proveedor else set()
+
+        for c in existentes.columns:
+            if c in columnas_cambiadas:
+                self.datos.iloc[pos, self.datos.columns.get_loc(c)] = existentes[
+                    c
+                ].to_numpy()
+
+        estructural = len(nuevas) > 0 or bool(
+            columnas_cambiadas & {self.grupo_abc, self.proveedor} - {None}
+        )
+        if estructural:
+            n0 = len(self.datos)
+            if len(nuevas):
+                self.datos = pd.concat([self.datos, delta.loc[nuevas]])
+                self._crecer(len(nuevas))
+            self._indexar()
+            agregadas = np.arange(n0, len(self.datos))
+            pos = np.concatenate([pos, agregadas])
+        else:
+            agregadas = np.empty(0, dtype=np.int64)
+
+        self._calcular_eoq(pos)
+        # Los grupos se expresan como etiquetas para sobrevivir a la reindexación
+        if self.abc_col and (self.abc_col in columnas_cambiadas or estructural):
+            grupos_abc |= self._grupos_de(self._abc, pos)
+            self._calcular_abc(self._codigos_de(self._abc, grupos_abc))
+        else:
+            grupos_abc = set()
+        if self.proveedor and (
+            columnas_cambiadas & {"D", "C1", "C3_item", self.proveedor} or estructural
+        ):
+            grupos_jrp |= self._grupos_de(self._jrp, pos)
+            self._calcular_jrp(self._codigos_de(self._jrp, grupos_jrp))
+        else:
+            grupos_jrp = set()
+
+        claves = self.datos.index[pos]
+        reporte = {
+            "filas": claves,
+            "nuevas": self.datos.index[agregadas],
+            "grupos_abc": sorted(grupos_abc, key=str),
+            "grupos_jrp": sorted(grupos_jrp, key=str),
+            "cambios_Q": pd.DataFrame(
+                {
+                    "antes": np.r_[antes_Q, np.full(len(agregadas), np.nan)],
+                    "despues": self.eoq["Q_optimo"][pos],
+                },
+                index=claves,
+            ),
+        }
+        if self.abc_col:
+            filas = self._filas(self._abc, self._codigos_de(self._abc, grupos_abc))
+            previa = np.full(len(self.datos), -1, dtype=np.int8)
+            previa[: len(antes_clase)] = antes_clase
+            movidas = filas[previa[filas] != self.clase[filas]]
+            clases = np.array(("-",) + GestorStockPipeline.CLASES_ABC)
+            reporte["cambios_clase"] = pd.DataFrame(
+                {
+                    "antes": clases[previa[movidas] + 1],
+                    "despues": clases[self.clase[movidas] + 1],
+                },
+                index=self.datos.index[movidas],
+            )
+        return reporte
+
+    @staticmethod
+    def _grupos_de(indice: tuple, pos: np.ndarray) -> set:
+        """Etiquetas de grupo de las filas ``pos``"""
+        codigos, _, _, claves = indice
+        if claves is None:
+            return {None} if len(pos) else set()
+        return set(claves[np.unique(codigos[pos])].tolist())
+
+    @staticmethod
+    def _codigos_de(indice: tuple, etiquetas: set) -> np.ndarray:
+        _, _, _, claves = indice
+        if claves is None:
+            return np.array([0]) if etiquetas else np.empty(0, dtype=np.int64)
+        codigos = pd.Index(claves).get_indexer(list(etiquetas))
+        return np.unique(codigos[codigos >= 0])
+
+    def _crecer(self, k: int) -> None:
+        """Agranda los arrays de resultados para ``k`` filas nuevas"""
+        previo = self.eoq
+        self.eoq = EOQLote("clasico", len(previo) + k, self.datos.index)
+        self.eoq.datos[: len(previo)] = previo.datos
+        self.eoq.codigo[: len(previo)] = previo.codigo
+        self.eoq.valido[: len(previo)] = previo.valido
+        self.pct_acum = np.r_[self.pct_acum, np.full(k, np.nan)]
+        self.clase = np.r_[self.clase, np.full(k, -1, dtype=np.int8)]
+        self.jrp = self.jrp.reindex(self.datos.index)
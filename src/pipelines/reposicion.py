@@ -0,0 +1,141 @@
+"""
+Reposición Conjunta Pipeline - Pedidos Agrupados por Proveedor
+
+Problema de reposición conjunta (JRP) para muchos grupos de SKU a la vez.
+"""
+
+from typing import Tuple, Union
+import numpy as np
+import pandas as pd
+
+from src.pipelines.business import ArrayLike, GestorStockPipeline
+
+
+class ReposicionConjuntaPipeline:
+    """Ciclo base y multiplicadores enteros por grupo de proveedor"""
+
+    @staticmethod
+    def _multiplicadores(
+        ratio: np.ndarray, T: np.ndarray, potencia_dos: bool
+    ) -> np.ndarray:
+        """Mejor k entero (o potencia de dos) dado T; ratio = 2s/(D·C1)"""
+        x = ratio / T**2
+        if potencia_dos:
+            # Potencia de dos por encima del óptimo entero; la mitad gana si x <= 2(k/2)²
+            j = np.ceil(np.log2(np.maximum(np.sqrt(x + 0.25) - 0.5, 1.0)))
+            k = 2.0**j
+            menor = k / 2
+            return np.where((menor >= 1) & (menor * k >= x), menor, k)
+        return np.maximum(np.ceil(np.sqrt(x + 0.25) - 0.5), 1.0)
+
+    @staticmethod
+    def resolver(
+        grupo: ArrayLike,
+        D: ArrayLike,
+        C1: ArrayLike,
+        C3_item: ArrayLike,
+        C3_grupo: Union[ArrayLike, dict, pd.Series],
+        dias: int = 365,
+        potencia_dos: bool = False,
+        inicios: int = 10,
+        max_iter: int = 20,
+    ) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """Reposición conjunta: cada ítem pide cada k·T, con T común al grupo
+
+        ``C3_grupo`` es el costo fijo del pedido conjunto (escalar, array por
+        ítem o mapeo clave → costo) y ``C3_item`` el costo adicional de
+        incluir cada ítem. Heurística tipo RAND: desde ``inicios`` valores
+        de T entre el ciclo de cada ítem y el de pedir todo junto, alterna
+        T*(k) = √(2(S + Σs/k) / ΣkDC₁) y el mejor k dado T, y se queda con
+        el de menor costo; todo vectorizado sobre grupos e inicios. Con
+        ``potencia_dos`` los k son potencias de dos.
+
+        Devuelve dos DataFrames: por ítem (alineado con la entrada) y por
+        grupo (indexado por la clave).
+        """
+        codigos, claves = pd.factorize(np.asarray(grupo), sort=True)
+        if np.any(codigos < 0):
+            raise ValueError("grupo no puede tener valores nulos")
+        G = len(claves)
+        D, C1, s = GestorStockPipeline._broadcast(D, C1, C3_item)
+        if isinstance(C3_grupo, (dict, pd.Series)):
+            S = pd.Series(C3_grupo).reindex(claves).to_numpy(dtype=np.float64)
+        else:
+            S = np.broadcast_to(np.asarray(C3_grupo, dtype=np.float64), D.shape)
+            S = S[np.unique(codigos, return_index=True)[1]]
+        if np.any(~(D > 0) | ~(C1 > 0) | ~(s >= 0)) or np.any(~(S > 0)):
+            raise ValueError("D, C1 y C3_grupo deben ser positivos y C3_item >= 0")
+
+        dh = D * C1
+        ratio = 2 * s / dh
+
+        def suma(valores: np.ndarray) -> np.ndarray:
+            """Suma por (inicio, grupo) de una matriz (inicios × ítems)"""
+            filas = np.arange(valores.shape[0])[:, None] * G + codigos
+            return np.bincount(
+                filas.ravel(), weights=valores.ravel(), minlength=valores.shape[0] * G
+            ).reshape(-1, G)
+
+        def ciclo(k: np.ndarray) -> np.ndarray:
+            return np.sqrt(2 * (S + suma(s / k)) / suma(k * dh))
+
+        def costo(T: np.ndarray, k: np.ndarray) -> np.ndarray:
+            return (S + suma(s / k)) / T + T / 2 * suma(k * dh)
+
+        T_max = ciclo(np.ones((1, len(D))))[0]
+        T_min = np.full(G, np.inf)
+        np.minimum.at(T_min, codigos, np.sqrt(ratio))
+        T_min = np.clip(T_min, T_max / 100, T_max)
+
+        # Inicios geométricos entre T_min y T_max: matriz (inicios × grupos)
+        paso = np.linspace(0, 1, max(inicios, 1))[:, None]
+        T = T_min * (T_max / T_min) ** paso
+        for _ in range(max_iter):
+            k = ReposicionConjuntaPipeline._multiplicadores(
+                ratio, T[:, codigos], potencia_dos
+            )
+            nuevo = ciclo(k)
+            if np.allclose(nuevo, T, rtol=1e-12, atol=0):
+                break
+            T = nuevo
+        k = ReposicionConjuntaPipeline._multiplicadores(
+            ratio, T[:, codigos], potencia_dos
+        )
+        if potencia_dos:
+            T = ciclo(k)
+        costos = costo(T, k)
+        mejor = costos.argmin(axis=0)
+        grupos = np.arange(G)
+        T, costo_grupo = T[mejor, grupos], costos[mejor, grupos]
+        k = k[mejor[codigos], np.arange(len(D))]
+
+        T_item = k * T[codigos]
+        independiente = np.sqrt(2 * dh * (S[codigos] + s))
+        items = pd.DataFrame(
+            {
+                "grupo": claves[codigos],
+                "k": k.astype(np.int64),
+                "Q": D * T_item,
+                "ciclo_dias": T_item * dias,
+                "costo_ordenamiento": s / T_item,
+                "costo_mantenimiento": T_item / 2 * dh,
+            },
+            index=grupo.index if isinstance(grupo, pd.Series) else None,
+        )
+        por_grupo = pd.DataFrame(
+            {
+                "ciclo_base_dias": T * dias,
+                "pedidos_anuales": 1 / T,
+                "costo_conjunto": S / T,
+                "costo_total": costo_grupo,
+                "costo_independiente": np.bincount(
+                    codigos, weights=independiente, minlength=G
+                ),
+                "items": np.bincount(codigos, minlength=G),
+            },
+            index=pd.Index(claves, name="grupo"),
+        )
+        por_grupo["ahorro"] = (
+            por_grupo["costo_independiente"] - por_grupo["costo_total"]
+        )
+        return items, por_grupo
@@ -0,0 +1,133 @@
+"""
+Sensibilidad Pipeline - Superficies de Costo EOQ
+
+Evalúa los modelos EOQ sobre grillas de parámetros en una sola pasada.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+import numpy as np
+
+from src.pipelines.business import ArrayLike, GestorStockPipeline
+
+
+@dataclass
+class Superficie:
+    """Resultado de un análisis de sensibilidad sobre una grilla"""
+
+    ejes: Dict[str, np.ndarray]
+    valores: Dict[str, np.ndarray]
+    elasticidad_costo: Dict[str, np.ndarray]
+    elasticidad_Q: Dict[str, np.ndarray]
+    valido: np.ndarray
+
+    @property
+    def forma(self) -> Tuple[int, ...]:
+        return self.valido.shape
+
+    def __getitem__(self, campo: str) -> np.ndarray:
+        return self.valores[campo]
+
+
+class SensibilidadPipeline:
+    """Sensibilidad de Q* y del costo total a los parámetros EOQ"""
+
+    MODELOS = {
+        "clasico": (
+            GestorStockPipeline.eoq_clasico_lote,
+            ("D", "C1", "C3", "C4", "lead_time"),
+        ),
+        "faltantes": (
+            GestorStockPipeline.eoq_faltantes_lote,
+            ("D", "C1", "C2", "C3", "C4"),
+        ),
+        "produccion": (
+            GestorStockPipeline.eoq_produccion_lote,
+            ("D", "C1", "C3", "d", "p", "C4"),
+        ),
+    }
+
+    @staticmethod
+    def evaluar(
+        modelo: str = "clasico",
+        ejes: Optional[Dict[str, ArrayLike]] = None,
+        dias: int = 365,
+        **fijos: float,
+    ) -> Superficie:
+        """Evalúa un modelo EOQ sobre la grilla producto de ``ejes``
+
+        Cada eje es un array 1-D de valores absolutos y ocupa una dimensión
+        de la superficie, en el orden dado. Los demás parámetros van fijos
+        como argumentos nombrados. Las elasticidades se calculan de forma
+        analítica (teorema de la envolvente en el óptimo).
+        """
+        if modelo not in SensibilidadPipeline.MODELOS:
+            raise ValueError(f"Modelo '{modelo}' no disponible")
+        funcion, nombres = SensibilidadPipeline.MODELOS[modelo]
+        ejes = {
+            k: np.asarray(v, dtype=np.float64).ravel() for k, v in (ejes or {}).items()
+        }
+        extra = (set(ejes) | set(fijos)) - set(nombres)
+        if extra or set(ejes) & set(fijos):
+            raise ValueError(f"Parámetros válidos para '{modelo}': {nombres}")
+
+        forma = tuple(len(v) for v in ejes.values())
+        params = {}
+        for k in nombres:
+            if k in ejes:
+                dim = list(ejes).index(k)
+                vista = ejes[k].reshape(
+                    [-1 if j == dim else 1 for j in range(len(forma))]
+                )
+                params[k] = np.broadcast_to(vista, forma)
+            else:
+                params[k] = np.broadcast_to(np.float64(fijos.get(k, 0)), forma)
+
+        lote = funcion(**{k: v.ravel() for k, v in params.items()}, dias=dias)
+        valores = {c: lote[c].reshape(forma) for c in lote.campos}
+        e_costo, e_Q = SensibilidadPipeline._elasticidades(modelo, params, valores)
+
+        return Superficie(
+            ejes=ejes,
+            valores=valores,
+            elasticidad_costo={k: e_costo[k] for k in ejes},
+            elasticidad_Q={k: np.broadcast_to(e_Q[k], forma) for k in ejes},
+            valido=lote.valido.reshape(forma),
+        )
+
+    @staticmethod
+    def _elasticidades(modelo: str, params: Dict, valores: Dict) -> tuple:
+        """Elasticidades de costo_total y Q* respecto de cada parámetro"""
+        D, C1, C3, C4 = params["D"], params["C1"], params["C3"], params["C4"]
+        total = valores["costo_total"]
+        orden = valores["costo_ordenamiento"]
+        mant = valores["costo_mantenimiento"]
+        compra = D * C4
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            e_costo = {
+                "D": (compra + orden) / total,
+                "C1": mant / total,
+                "C3": orden / total,
+                "C4": compra / total,
+            }
+            e_Q = {"D": 0.5, "C1": -0.5, "C3": 0.5, "C4": 0.0}
+
+            if modelo == "clasico":
+                e_costo["lead_time"] = np.zeros_like(total)
+                e_Q["lead_time"] = 0.0
+            elif modelo == "faltantes":
+                C2 = params["C2"]
+                e_costo["C2"] = valores["costo_faltantes"] / total
+                e_Q["C1"] = -0.5 * C2 / (C1 + C2)
+                e_Q["C2"] = -0.5 * C1 / (C1 + C2)
+            elif modelo == "produccion":
+                d, p = params["d"], params["p"]
+                activo = (d > 0) & (p > 0)
+                # Elasticidad de (1 - d/p) respecto de d, con signo cambiado
+                r = np.where(activo, (d / p) / valores["factor_produccion"], 0.0)
+                e_costo["d"] = -mant * r / total
+                e_costo["p"] = mant * r / total
+                e_Q["d"] = 0.5 * r
+                e_Q["p"] = -0.5 * r
+        return e_costo, e_Q
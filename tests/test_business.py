@@ -0,0 +1,88 @@
+import copy
+import pickle
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from src.pipelines.business import GestorStockPipeline
+from src.pipelines.portafolio import PortafolioPipeline
+
+
+def test_eoq_lote_copia_y_pickle(tmp_path):
+    lote = GestorStockPipeline.eoq_clasico_lote(
+        np.array([100.0, -1.0, 400.0]), 2.0, 5.0, lead_time=3
+    )
+    for otro in (
+        pickle.loads(pickle.dumps(lote)),
+        copy.copy(lote),
+        copy.deepcopy(lote),
+    ):
+        np.testing.assert_array_equal(otro.datos, lote.datos)
+        np.testing.assert_array_equal(otro.codigo, lote.codigo)
+        assert otro.Q_optimo[0] == lote.Q_optimo[0]
+
+    fila = copy.deepcopy(lote.fila(2))
+    assert fila.to_dict() == lote.fila(2).to_dict()
+    assert pickle.loads(pickle.dumps(lote.fila(0))).Q_optimo == lote.Q_optimo[0]
+
+    ruta = tmp_path / "lote.joblib"
+    joblib.dump(lote, ruta)
+    np.testing.assert_array_equal(joblib.load(ruta).datos, lote.datos)
+
+
+def test_portafolio_joblib(tmp_path):
+    datos = pd.DataFrame(
+        {
+            "sku": ["a", "b", "c", "d"],
+            "D": [1000.0, 500.0, 200.0, 50.0],
+            "C1": [2.0, 1.0, 3.0, 1.5],
+            "C3": [50.0, 40.0, 30.0, 20.0],
+        }
+    )
+    datos["valor"] = datos["D"] * datos["C1"]
+    port = PortafolioPipeline(datos, clave="sku", abc="valor")
+    ruta = tmp_path / "portafolio.joblib"
+    joblib.dump(port, ruta)
+    cargado = joblib.load(ruta)
+    pd.testing.assert_frame_equal(cargado.resultados(), port.resultados())
+
+    delta = pd.DataFrame({"D": [900.0]}, index=["b"])
+    cargado.actualizar(delta)
+    port.actualizar(delta)
+    pd.testing.assert_frame_equal(cargado.resultados(), port.resultados())
+
+
+def test_abc_grupos_precision_por_grupo():
+    # Un grupo chico después de uno enorme no pierde precisión
+    datos = pd.DataFrame(
+        {"g": [0, 0, 0, 1, 1, 1], "v": [1e17, 1e17, 1e17, 3.0, 2.0, 1.0]}
+    )
+    res, _ = GestorStockPipeline.abc_grupos(datos, "v", by="g")
+    np.testing.assert_allclose(res["pct_acum_v"].to_numpy()[3:], [50.0, 500 / 6, 100.0])
+    assert list(res["clase_v"][3:]) == ["A", "B", "C"]
+    assert not res["pct_acum_v"].isna().any()
+
+
+def test_abc_archivo_conserva_columnas(tmp_path):
+    datos = pd.DataFrame(
+        {
+            "producto": ["p1", "p2", "p3", "p1"],
+            "nombre": ["uno", "dos", "tres", "uno"],
+            "valor": [50.0, 30.0, 15.0, 5.0],
+        }
+    )
+    ruta = tmp_path / "productos.csv"
+    datos.to_csv(ruta, index=False)
+
+    res, stats = GestorStockPipeline.abc_archivo(str(ruta), "valor", bloque=2)
+    esperado, esperado_stats = GestorStockPipeline.abc(datos, "valor")
+    pd.testing.assert_frame_equal(res, esperado)
+    pd.testing.assert_frame_equal(stats, esperado_stats)
+
+    res, _ = GestorStockPipeline.abc_archivo(str(ruta), "valor", "producto", bloque=2)
+    assert dict(zip(res["producto"], res["valor"])) == {
+        "p1": 55.0,
+        "p2": 30.0,
+        "p3": 15.0,
+    }
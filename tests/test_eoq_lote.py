@@ -0,0 +1,200 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.pipelines.business import GestorStockPipeline
+
+
+def _catalogo(n=200, seed=0):
+    rng = np.random.default_rng(seed)
+    datos = pd.DataFrame(
+        {
+            "D": rng.uniform(100, 10_000, n),
+            "C1": rng.uniform(0.5, 10, n),
+            "C2": rng.uniform(1, 20, n),
+            "C3": rng.uniform(10, 200, n),
+            "C4": rng.uniform(0, 5, n),
+            "lead_time": rng.integers(0, 30, n).astype(float),
+        }
+    )
+    # Algunas filas inválidas
+    datos.loc[::17, "D"] = -1.0
+    datos.loc[5::23, "C3"] = 0.0
+    return datos
+
+
+def _comparar(lote, escalares):
+    for i, r in enumerate(escalares):
+        if r is None:
+            assert not lote.valido[i]
+            assert np.isnan(lote.datos[i]).all()
+            continue
+        assert lote.valido[i]
+        for c in lote.campos:
+            esperado = getattr(r, c) if not isinstance(r, dict) else r[c]
+            assert lote[c][i] == pytest.approx(esperado, rel=1e-12)
+
+
+def _escalar(funcion, *args, **kwargs):
+    try:
+        return funcion(*args, **kwargs)
+    except ValueError:
+        return None
+
+
+def test_eoq_clasico_lote_igual_al_escalar():
+    datos = _catalogo()
+    lote = GestorStockPipeline.eoq_clasico_lote(datos)
+    escalares = [
+        _escalar(GestorStockPipeline.eoq_clasico, r.D, r.C1, r.C3, r.C4, r.lead_time)
+        for r in datos.itertuples()
+    ]
+    _comparar(lote, escalares)
+    assert lote.indice is datos.index
+    assert list(lote.errores(0)) == ["D debe ser positiva"]
+
+
+def test_eoq_faltantes_lote_igual_al_escalar():
+    datos = _catalogo()
+    datos.loc[3::29, "C2"] = -2.0
+    lote = GestorStockPipeline.eoq_faltantes_lote(datos)
+    escalares = [
+        _escalar(GestorStockPipeline.eoq_faltantes, r.D, r.C1, r.C2, r.C3, r.C4)
+        for r in datos.itertuples()
+    ]
+    _comparar(lote, escalares)
+
+
+def test_eoq_produccion_lote_igual_al_escalar():
+    datos = _catalogo()
+    rng = np.random.default_rng(1)
+    datos["d"] = datos["D"] / 365
+    datos["p"] = datos["d"] * rng.uniform(0.5, 4, len(datos))
+    lote = GestorStockPipeline.eoq_produccion_lote(datos)
+    escalares = [
+        _escalar(GestorStockPipeline.eoq_produccion, r.D, r.C1, r.C3, r.d, r.p, r.C4)
+        for r in datos.itertuples()
+    ]
+    _comparar(lote, escalares)
+    assert (~lote.valido[datos["p"] <= datos["d"]]).all()
+
+
+def test_eoq_descuentos_lote_igual_al_escalar():
+    rng = np.random.default_rng(2)
+    n = 100
+    D = rng.uniform(100, 10_000, n)
+    C3 = rng.uniform(10, 200, n)
+    i = rng.uniform(0.05, 0.3, n)
+    largo = rng.integers(1, 5, n)
+    offsets = np.r_[0, np.cumsum(largo)]
+    precios, minimos, maximos = [], [], []
+    for k in largo:
+        precio = np.sort(rng.uniform(1, 20, k))[::-1]
+        cortes = np.r_[0, np.sort(rng.uniform(100, 3000, k - 1))]
+        precios += list(precio)
+        minimos += list(cortes)
+        maximos += list(np.r_[cortes[1:] - 1, np.inf])
+    precios, minimos, maximos = map(np.array, (precios, minimos, maximos))
+
+    lote, costo = GestorStockPipeline.eoq_descuentos_lote(
+        D, C3, i, precios, minimos, maximos, offsets
+    )
+    assert costo.shape == precios.shape
+    for s in range(n):
+        tramos = slice(offsets[s], offsets[s + 1])
+        rangos = [
+            {"precio": p, "min": a, "max": b}
+            for p, a, b in zip(precios[tramos], minimos[tramos], maximos[tramos])
+        ]
+        r = GestorStockPipeline.eoq_descuentos(D[s], C3[s], i[s], rangos)
+        assert lote.valido[s]
+        assert lote["tramo"][s] == rangos.index(r["rango"])
+        for c in ("Q_optimo", "precio_unitario", "costo_total", "costo_compra"):
+            assert lote[c][s] == pytest.approx(r[c], rel=1e-12)
+
+    # Formato denso (n, k) con NaN equivale al CSR
+    k = largo.max()
+    denso = np.full((n, k), np.nan)
+    for s in range(n):
+        denso[s, : largo[s]] = precios[offsets[s] : offsets[s + 1]]
+    minimos_d, maximos_d = denso.copy(), denso.copy()
+    for s in range(n):
+        minimos_d[s, : largo[s]] = minimos[offsets[s] : offsets[s + 1]]
+        maximos_d[s, : largo[s]] = maximos[offsets[s] : offsets[s + 1]]
+    denso_lote, _ = GestorStockPipeline.eoq_descuentos_lote(
+        D, C3, i, denso, minimos_d, maximos_d
+    )
+    np.testing.assert_array_equal(denso_lote.datos, lote.datos)
+
+
+def test_eoq_descuentos_lote_todo_invalido():
+    precios = np.array([5.0, 4.0, 3.0])
+    offsets = np.array([0, 2, 3])
+    lote, costo = GestorStockPipeline.eoq_descuentos_lote(
+        np.array([-1.0, 0.0]), 10.0, 0.2, precios, offsets=offsets
+    )
+    assert not lote.valido.any()
+    assert np.isnan(lote.datos).all()
+    assert np.isinf(costo).all()
+
+    lote, _ = GestorStockPipeline.eoq_descuentos_lote(
+        100.0, 10.0, -0.1, precios, offsets=offsets
+    )
+    assert lote.errores(0) == ["Sin resultado", "i debe ser positiva"]
+
+    vacio, _ = GestorStockPipeline.eoq_descuentos_lote(
+        np.empty(0), 10.0, 0.2, np.empty(0), offsets=np.array([0])
+    )
+    assert len(vacio) == 0
+
+
+def test_eoq_restringido_dos_restricciones_activas():
+    from scipy.optimize import minimize
+
+    rng = np.random.default_rng(2)
+    n = 8
+    D, C1, C3 = (
+        rng.uniform(100, 10_000, n),
+        rng.uniform(0.5, 10, n),
+        rng.uniform(10, 200, n),
+    )
+    espacio, precio = rng.uniform(0.1, 3, n), rng.uniform(1, 100, n)
+    Q0 = np.sqrt(2 * D * C3 / C1)
+    capacidad, presupuesto = 0.5 * espacio @ Q0, 0.5 * precio @ Q0
+
+    lote, info = GestorStockPipeline.eoq_restringido_lote(
+        D, C1, C3, espacio, capacidad, precio, presupuesto
+    )
+    Q = lote.Q_optimo
+    assert info["convergio"]
+    # KKT: ambas activas con multiplicadores positivos y Q estacionario
+    assert info["lambda_espacio"] > 0 and info["lambda_presupuesto"] > 0
+    assert espacio @ Q == pytest.approx(capacidad, rel=1e-8)
+    assert precio @ Q == pytest.approx(presupuesto, rel=1e-8)
+    gradiente = -D * C3 / Q**2 + C1 / 2
+    multiplicadores = info["lambda_espacio"] * espacio
+    multiplicadores += info["lambda_presupuesto"] * precio
+    np.testing.assert_allclose(gradiente + multiplicadores, 0, atol=1e-6)
+
+    def costo(q):
+        return np.sum(D * C3 / q + q / 2 * C1)
+
+    referencia = minimize(
+        costo,
+        0.3 * Q0,
+        method="SLSQP",
+        bounds=[(1e-6, None)] * n,
+        constraints=[
+            {"type": "ineq", "fun": lambda q: capacidad - espacio @ q},
+            {"type": "ineq", "fun": lambda q: presupuesto - precio @ q},
+        ],
+        options={"maxiter": 2000, "ftol": 1e-9},
+    )
+    assert referencia.success
+    assert costo(Q) == pytest.approx(referencia.fun, rel=1e-7)
+
+    with pytest.warns(RuntimeWarning, match="no convergió"):
+        _, info = GestorStockPipeline.eoq_restringido_lote(
+            D, C1, C3, espacio, capacidad, precio, presupuesto, max_iter=1
+        )
+    assert not info["convergio"]
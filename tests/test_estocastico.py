@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.pipelines.estocastico import StockSeguridadPipeline
+
+
+def test_lead_time_cero_con_sigma_lead():
+    with pytest.raises(ValueError, match="lead_time"):
+        StockSeguridadPipeline.calcular(
+            np.array([10.0, 20.0]), 2.0, lead_time=[5.0, 0.0], sigma_lead=1.0, seed=0
+        )
+
+
+def test_sigma_faltante():
+    datos = pd.DataFrame({"mu": [10.0, 20.0], "lead_time": [5.0, 7.0]})
+    with pytest.raises(ValueError, match="sigma"):
+        StockSeguridadPipeline.calcular(datos, seed=0)
+    with pytest.raises(ValueError, match="sigma"):
+        StockSeguridadPipeline.calcular(
+            datos.assign(sigma=[1.0, np.nan]), seed=0, escenarios=100
+        )
+
+
+def test_calcular_reproducible():
+    datos = pd.DataFrame(
+        {
+            "mu": [10.0, 20.0],
+            "sigma": [2.0, 3.0],
+            "lead_time": [5.0, 7.0],
+            "sigma_lead": [1.0, 0.0],
+        }
+    )
+    a = StockSeguridadPipeline.calcular(datos, escenarios=2000, seed=1)
+    b = StockSeguridadPipeline.calcular(datos, escenarios=2000, seed=1)
+    pd.testing.assert_frame_equal(a, b)
+    assert np.isfinite(a.to_numpy()[:, :4]).all()
+    assert (a["nivel_ciclo"] >= 0.95).all()
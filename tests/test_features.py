@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+from src.pipelines.features import FeaturesPipeline
+
+
+def test_transformar_igual_a_groupby_de_pandas():
+    rng = np.random.default_rng(0)
+    partes = []
+    # Largos desiguales, incluida una serie más corta que las ventanas
+    for sku, n in zip("abcd", (60, 3, 35, 1)):
+        fechas = pd.date_range("2024-01-01", periods=n, freq="D")
+        partes.append(pd.DataFrame({"sku": sku, "fecha": fechas}))
+    datos = pd.concat(partes, ignore_index=True)
+    # Fechas duplicadas dentro de una serie: se respeta el orden de las filas
+    datos.loc[[10, 11, 12], "fecha"] = datos.loc[10, "fecha"]
+    datos["demanda"] = rng.poisson(10, len(datos)).astype(np.float32)
+    datos = datos.sample(frac=1, random_state=1)
+
+    pipe = FeaturesPipeline(lags=(1, 7), ventanas=(2, 7), alfas=(0.3,))
+    F = pipe.transformar(datos, serie="sku")
+    assert F.index.equals(datos.index)
+
+    ordenado = datos.sort_values(["sku", "fecha"], kind="stable")
+    g = ordenado.groupby("sku", sort=False)["demanda"]
+    esperado = {}
+    for L in pipe.lags:
+        esperado[f"lag_{L}"] = g.shift(L)
+    previo = g.shift(1)
+    for w in pipe.ventanas:
+        movil = previo.groupby(ordenado["sku"]).rolling(w, min_periods=w)
+        movil = {
+            "media": movil.mean(),
+            "std": movil.std(),
+            "min": movil.min(),
+            "max": movil.max(),
+        }
+        for nombre, col in movil.items():
+            esperado[f"{nombre}_{w}"] = col.droplevel(0)
+    esperado["ewm_0.3"] = g.transform(
+        lambda s: s.ewm(alpha=0.3, adjust=False).mean().shift(1)
+    )
+    esperado = pd.DataFrame(esperado).reindex(datos.index)
+
+    pd.testing.assert_frame_equal(
+        F[esperado.columns], esperado, check_dtype=False, rtol=1e-5
+    )
+    dias = (datos["fecha"] - datos["fecha"].min()).dt.days
+    np.testing.assert_array_equal(F["dia"], dias)
@@ -0,0 +1,225 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.pipelines.ml import MLPipeline, PredictorDemandaPipeline, RegistroModelos
+
+
+def _datos(n=400, seed=0):
+    np.random.seed(seed)
+    df = PredictorDemandaPipeline.generar(n)
+    return df[["dia", "mes", "trimestre"]], df["demanda"]
+
+
+def test_registro_guarda_y_carga(tmp_path):
+    X, y = _datos()
+    pipe = MLPipeline("rf", {"n_estimators": 10, "random_state": 0})
+    pipe.entrenar(X, y)
+    registro = RegistroModelos(str(tmp_path))
+    assert registro.registrar("demanda", pipe) == 1
+    assert registro.registrar("demanda", pipe) == 2
+
+    cargado = registro.cargar("demanda")
+    np.testing.assert_array_equal(cargado.predecir_lote(X), pipe.predecir_lote(X))
+    assert cargado.metricas == pipe.metricas
+    # Solo los arrays numpy planos quedan mapeados
+    assert isinstance(cargado.residuos, np.memmap)
+    assert list(registro.listar()["version"]) == [1, 2]
+
+    # Una versión reservada por otro proceso no se reutiliza
+    open(tmp_path / "demanda" / "v0003.json", "x").close()
+    assert registro.versiones("demanda") == [1, 2]
+    assert registro.registrar("demanda", pipe) == 4
+    # Un modelo sin ficha (registro antiguo o interrumpido) no rompe listar
+    (tmp_path / "demanda" / "v0002.json").unlink()
+    assert list(registro.listar()["version"]) == [1, 4]
+
+    with ThreadPoolExecutor(4) as ex:
+        nuevas = list(ex.map(lambda _: registro.registrar("otro", pipe), range(8)))
+    assert sorted(nuevas) == list(range(1, 9))
+    assert sorted(os.listdir(tmp_path / "otro"))[-1] == "v0008.json"
+
+
+def test_buscar_presupuesto_incluye_ajuste_final():
+    X, y = _datos()
+    espacio = {"max_depth": [2, 3, 4]}
+    tabla, pipe = MLPipeline.buscar(
+        X, y, "rf", espacio, "estimadores", max_recurso=27, n_candidatos=9, n_jobs=1
+    )
+    assert tabla.attrs["recurso_final"] == 27
+    assert pipe.modelo.n_estimators == 27
+
+    # Sin tiempo: se corta la primera ronda y el mejor queda con su recurso
+    tabla, pipe = MLPipeline.buscar(
+        X,
+        y,
+        "rf",
+        espacio,
+        "estimadores",
+        max_recurso=27,
+        n_candidatos=9,
+        presupuesto=1e-9,
+        n_jobs=1,
+    )
+    assert len(tabla) == 1
+    assert tabla.attrs["recurso_final"] == 3
+    assert pipe.modelo.n_estimators == 3
+
+
+def test_actualizar_acota_el_ensamble():
+    X, y = _datos()
+    rf = MLPipeline("rf", {"n_estimators": 20, "random_state": 0})
+    rf.entrenar(X, y)
+    base = list(rf.modelo.estimators_)
+    for k in range(10):
+        info = rf.actualizar(X[k * 10 : k * 10 + 10], y[k * 10 : k * 10 + 10])
+    assert info["arboles"] == len(rf.modelo.estimators_) == 40
+    # Los árboles del ajuste completo se conservan
+    assert rf.modelo.estimators_[:20] == base
+    assert np.isfinite(rf.predecir_lote(X)).all()
+
+    gb = MLPipeline("gb", {"n_estimators": 20, "random_state": 0})
+    gb.entrenar(X, y)
+    for k in range(5):
+        info = gb.actualizar(X[:10], y[:10], max_arboles=35)
+    assert info["arboles"] == 30 and not info["reentrenado"]
+    info = gb.actualizar(X[:10], y[:10], max_arboles=35, historia=lambda: (X, y))
+    assert info["reentrenado"] and info["arboles"] == 20
+
+
+def test_actualizar_reentrena_con_deriva():
+    X, y = _datos()
+    rf = MLPipeline("rf", {"n_estimators": 10, "random_state": 0})
+    rf.entrenar(X, y)
+    rf.actualizar(X[:50], y[:50] + 500, max_arboles=15)
+    info = rf.actualizar(X[:50], y[:50] + 500, historia=lambda: (X, y + 500))
+    assert info["deriva"] and info["reentrenado"]
+    assert len(rf.modelo.estimators_) == 10
+    assert abs(rf.predecir_lote(X).mean() - (y.mean() + 500)) < 20
+
+
+def test_descomponer_sin_ruido():
+    t = np.arange(730)
+    tendencia = 100 + 0.05 * t
+    semanal = 3 * np.sin(2 * np.pi * t / 7)
+    anual = 8 * np.sin(2 * np.pi * t / 365)
+    partes = PredictorDemandaPipeline.descomponer_lote(
+        (tendencia + semanal + anual)[None, :], periodos=(7, 365)
+    )
+    np.testing.assert_allclose(partes["estacional_365"][0], anual, atol=0.05)
+    np.testing.assert_allclose(partes["estacional_7"][0], semanal, atol=0.05)
+    np.testing.assert_allclose(partes["tendencia"][0], tendencia, atol=0.05)
+    assert partes["residuo"][0].std() < 0.01
+
+
+def test_media_centrada_igual_a_la_ventana():
+    Y = np.random.default_rng(0).normal(size=(2, 40))
+    Y[1, 7] = np.nan
+    for w in (5, 6):
+        h = w // 2
+        pesos = np.ones(2 * h + 1)
+        if w % 2 == 0:
+            pesos[[0, -1]] = 0.5
+        media = PredictorDemandaPipeline._media_centrada(Y, w)
+        for i in range(h, 40 - h):
+            v = Y[:, i - h : i + h + 1]
+            p = np.where(np.isnan(v), 0.0, pesos)
+            np.testing.assert_allclose(media[:, i], np.nansum(v * p, 1) / p.sum(1))
+    recta = 2.0 * np.arange(40)[None, :] + 1
+    np.testing.assert_allclose(
+        PredictorDemandaPipeline._media_centrada(recta, 7, lineal=True), recta
+    )
+
+
+def test_descomponer_periodo_no_estimable():
+    serie = pd.Series(np.arange(365.0))
+    with pytest.raises(ValueError, match="730"):
+        PredictorDemandaPipeline.descomponer(serie, p=365)
+    with pytest.warns(UserWarning, match="365"):
+        tendencia, _, _ = PredictorDemandaPipeline.descomponer(serie)
+    assert np.isfinite(tendencia).all()
+    with pytest.warns(UserWarning, match="365"):
+        partes = PredictorDemandaPipeline.descomponer_lote(
+            serie.to_numpy()[None, :], periodos=(7, 365)
+        )
+    assert not partes["estacional_365"].any()
+    with pytest.raises(ValueError, match="iteraciones"):
+        PredictorDemandaPipeline.descomponer_lote(serie.to_numpy(), iteraciones=0)
+
+
+def test_entrenar_despues_de_actualizar():
+    X, y = _datos()
+    for tipo in ("rf", "gb"):
+        pipe = MLPipeline(tipo, {"n_estimators": 10, "random_state": 0})
+        pipe.entrenar(X, y)
+        pipe.actualizar(X[:20], y[:20])
+        assert not pipe.modelo.warm_start
+        assert pipe.modelo.n_estimators == 10
+        antes = pipe.predecir_lote(X)
+        pipe.entrenar(X, y + 1000)
+        assert len(pipe.modelo.estimators_) == 10
+        assert pipe.predecir_lote(X).mean() - antes.mean() > 900
+
+
+def test_generar_lote_paralelo_y_archivo(tmp_path):
+    generar = PredictorDemandaPipeline.generar_lote
+    serial = np.concatenate(list(generar(23, dias=50, seed=4, bloque=7)))
+    paralelo = np.concatenate(list(generar(23, dias=50, seed=4, bloque=7, n_jobs=2)))
+    assert serial.shape == (23, 50) and serial.dtype == np.float32
+    np.testing.assert_array_equal(serial, paralelo)
+    # Cada SKU tiene su propio generador: la serie no depende del bloque
+    np.testing.assert_array_equal(
+        serial, np.concatenate(list(generar(23, dias=50, seed=4, bloque=5)))
+    )
+    assert (serial >= 0).all() and (serial == 0).any()
+    assert not np.array_equal(serial, next(generar(23, dias=50, seed=5, bloque=23)))
+
+    ruta = PredictorDemandaPipeline.generar_archivo(
+        str(tmp_path / "demanda.npy"), 23, dias=50, seed=4, bloque=6, n_jobs=2
+    )
+    np.testing.assert_array_equal(np.load(ruta), serial)
+
+
+def test_generar_archivo_parquet(tmp_path):
+    pytest.importorskip("pyarrow")
+    serial = np.concatenate(
+        list(PredictorDemandaPipeline.generar_lote(23, dias=50, seed=4))
+    )
+    ruta = PredictorDemandaPipeline.generar_archivo(
+        str(tmp_path / "demanda.parquet"), 23, dias=50, seed=4, bloque=6
+    )
+    largo = pd.read_parquet(ruta)
+    assert list(largo.columns) == ["sku", "dia", "demanda"]
+    ancho = largo.pivot(index="sku", columns="dia", values="demanda")
+    np.testing.assert_array_equal(ancho.to_numpy(), serial)
+
+
+@pytest.mark.parametrize("modo", ["expanding", "rolling"])
+def test_folds_no_entrenan_con_el_futuro(modo):
+    for n, folds, test, ventana in [(100, 5, 0.2, None), (1000, 7, 0.5, 60)]:
+        cortes = MLPipeline.folds_temporales(n, folds, test, ventana, modo)
+        assert len(cortes) == folds and cortes[-1][1].stop == n
+        for k, (tr, te) in enumerate(cortes):
+            assert tr.stop == te.start and 0 < tr.stop - tr.start
+            if modo == "rolling" and ventana:
+                assert tr.stop - tr.start == ventana
+            if k:
+                assert te.start == cortes[k - 1][1].stop
+
+    X, y = _datos()
+    pipe = MLPipeline("rf", {"n_estimators": 5, "random_state": 0})
+    pipe.entrenar(X, y, validacion=modo, folds=4, ventana=100, n_jobs=1)
+    bt = pipe.backtest
+    # El test de cada fold empieza donde termina su train y donde terminó el
+    # test anterior; el train nunca pasa del inicio de su test
+    assert (bt["fin_train"].iloc[1:].to_numpy() == bt["fin_test"].iloc[:-1]).all()
+    assert bt["fin_test"].iloc[-1] == len(y)
+    largo = bt["fin_train"] - bt["inicio_train"]
+    if modo == "rolling":
+        assert (largo == 100).all()
+    else:
+        assert (bt["inicio_train"] == 0).all()
+    assert len(pipe.residuos) == len(y) - bt["fin_train"].iloc[0]
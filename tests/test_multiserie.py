@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import Ridge
+
+from src.pipelines.multiserie import MultiSeriePipeline, _calendario
+
+
+def _datos():
+    rng = np.random.default_rng(0)
+    partes = []
+    for i, (sku, n) in enumerate(zip(["c", "a", "d", "b", "e"], (90, 40, 2, 65, 120))):
+        fechas = pd.date_range("2024-01-01", periods=n, freq="D") + pd.Timedelta(
+            days=3 * i
+        )
+        demanda = 10 + i + np.sin(np.arange(n) / 7) + rng.normal(0, 1, n)
+        partes.append(pd.DataFrame({"sku": sku, "fecha": fechas, "demanda": demanda}))
+    return pd.concat(partes, ignore_index=True).sample(frac=1, random_state=1)
+
+
+def test_pronosticar_igual_a_un_bucle_por_sku(tmp_path):
+    datos, horizonte = _datos(), 10
+    pipe = MultiSeriePipeline(
+        "ridge", {"alpha": 1.0}, horizonte=horizonte, n_jobs=2, bloque=2
+    )
+    pronostico, metricas = pipe.pronosticar(datos)
+    pronostico = pronostico.set_index(["sku", "fecha"])["pronostico"]
+    metricas = metricas.set_index("sku")
+
+    origen = datos["fecha"].min()
+    for sku, serie in datos.sort_values("fecha").groupby("sku"):
+        dias = ((serie["fecha"] - origen).dt.days).to_numpy()
+        F, y = _calendario(dias, origen), serie["demanda"].to_numpy()
+        n_test = min(horizonte, len(y) - 1)
+        modelo = Ridge(alpha=1.0).fit(F[:-n_test], y[:-n_test])
+        error = modelo.predict(F[-n_test:]) - y[-n_test:]
+        assert metricas.loc[sku, "filas"] == len(y)
+        assert metricas.loc[sku, "rmse"] == pytest.approx(np.sqrt(np.mean(error**2)))
+        assert metricas.loc[sku, "mae"] == pytest.approx(np.mean(np.abs(error)))
+
+        futuros = dias[-1] + np.arange(1, horizonte + 1)
+        esperado = Ridge(alpha=1.0).fit(F, y).predict(_calendario(futuros, origen))
+        fechas = origen + pd.to_timedelta(futuros, unit="D")
+        np.testing.assert_allclose(
+            pronostico.loc[sku].loc[fechas].to_numpy(), esperado, rtol=1e-9
+        )
+    assert len(pronostico) == horizonte * datos["sku"].nunique()
+
+    # Escribir a disco por bloques da lo mismo que en memoria
+    ruta = str(tmp_path / "pronostico.csv")
+    assert pipe.pronosticar(datos, salida=ruta)[0] is None
+    leido = pd.read_csv(ruta, parse_dates=["fecha"]).set_index(["sku", "fecha"])
+    pd.testing.assert_series_equal(
+        leido["pronostico"].sort_index(), pronostico.sort_index(), check_exact=False
+    )
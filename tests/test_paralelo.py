@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.pipelines.business import GestorStockPipeline
+from src.pipelines.paralelo import ParaleloPipeline
+
+
+@pytest.fixture(scope="module")
+def paralelo():
+    with ParaleloPipeline(n_workers=2, bloque=97) as p:
+        yield p
+
+
+@pytest.fixture(scope="module")
+def datos():
+    rng = np.random.default_rng(0)
+    n = 1000
+    datos = pd.DataFrame(
+        {
+            "D": rng.uniform(100, 10_000, n),
+            "C1": rng.uniform(0.5, 10, n),
+            "C2": rng.uniform(1, 20, n),
+            "C3": rng.uniform(10, 200, n),
+            "lead_time": rng.integers(0, 30, n).astype(float),
+            "d": rng.uniform(1, 20, n),
+            "p": rng.uniform(5, 60, n),
+            "grupo": rng.choice(list("wxyz"), n),
+            "familia": rng.integers(0, 3, n),
+        }
+    )
+    datos.loc[::13, "D"] = -1.0
+    # Valores repetidos para ejercitar el desempate estable
+    datos["valor"] = np.round(datos["D"] * datos["C1"], -3)
+    datos["margen"] = rng.pareto(1.5, n)
+    return datos
+
+
+@pytest.mark.parametrize(
+    "modelo, serial",
+    [
+        ("clasico", GestorStockPipeline.eoq_clasico_lote),
+        ("faltantes", GestorStockPipeline.eoq_faltantes_lote),
+        ("produccion", GestorStockPipeline.eoq_produccion_lote),
+    ],
+)
+def test_eoq_lote(paralelo, datos, modelo, serial):
+    esperado = serial(datos)
+    lote = paralelo.eoq_lote(datos, modelo)
+    np.testing.assert_array_equal(lote.datos, esperado.datos)
+    np.testing.assert_array_equal(lote.codigo, esperado.codigo)
+    np.testing.assert_array_equal(lote.valido, esperado.valido)
+
+
+def test_eoq_descuentos_lote(paralelo, datos):
+    rng = np.random.default_rng(1)
+    n = len(datos)
+    offsets = np.r_[0, np.cumsum(rng.integers(0, 4, n))]
+    precios = rng.uniform(1, 20, offsets[-1])
+    minimos = rng.uniform(0, 500, offsets[-1])
+    maximos = minimos + rng.uniform(0, 3000, offsets[-1])
+    args = (datos["D"], datos["C3"], 0.2, precios, minimos, maximos, offsets)
+    esperado, costo_esperado = GestorStockPipeline.eoq_descuentos_lote(*args)
+    lote, costo = paralelo.eoq_descuentos_lote(*args)
+    np.testing.assert_array_equal(lote.datos, esperado.datos)
+    np.testing.assert_array_equal(lote.codigo, esperado.codigo)
+    np.testing.assert_array_equal(costo, costo_esperado)
+
+
+def test_abc(paralelo, datos):
+    valores = datos["valor"].to_numpy()
+    np.testing.assert_array_equal(
+        paralelo.orden_abc(valores), np.argsort(-valores, kind="stable")
+    )
+    res, stats = paralelo.abc(datos, "valor")
+    esperado, stats_esperado = GestorStockPipeline.abc(datos, "valor")
+    pd.testing.assert_frame_equal(res, esperado)
+    pd.testing.assert_frame_equal(stats, stats_esperado)
+
+
+def test_abc_grupos(paralelo, datos):
+    for by in ("grupo", ["grupo", "familia"], None):
+        res, cruce = paralelo.abc_grupos(datos, ["valor", "margen"], by)
+        esperado, cruce_esperado = GestorStockPipeline.abc_grupos(
+            datos, ["valor", "margen"], by
+        )
+        pd.testing.assert_frame_equal(res, esperado)
+        pd.testing.assert_frame_equal(cruce, cruce_esperado)
+
+
+def test_eoq_descuentos_bloque_invalido():
+    n = 300
+    D = np.full(n, 500.0)
+    D[100:200] = -1.0
+    offsets = np.arange(n + 1)
+    precios = np.full(n, 5.0)
+    esperado, _ = GestorStockPipeline.eoq_descuentos_lote(
+        D, 10.0, 0.2, precios, offsets=offsets
+    )
+    with ParaleloPipeline(n_workers=2, bloque=100) as p:
+        lote, _ = p.eoq_descuentos_lote(D, 10.0, 0.2, precios, offsets=offsets)
+    np.testing.assert_array_equal(lote.datos, esperado.datos)
+    assert not lote.valido[100:200].any() and lote.valido[:100].all()
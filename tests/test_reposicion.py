@@ -0,0 +1,33 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from src.pipelines.reposicion import ReposicionConjuntaPipeline
+
+
+def test_resolver_contra_fuerza_bruta():
+    rng = np.random.default_rng(0)
+    G, n = 30, 3
+    grupo = np.repeat(np.arange(G), n)
+    D = rng.uniform(10, 5000, G * n)
+    C1 = rng.uniform(0.5, 10, G * n)
+    s = rng.uniform(1, 100, G * n)
+    S = rng.uniform(50, 500, G)
+    _, rand = ReposicionConjuntaPipeline.resolver(grupo, D, C1, s, S[grupo])
+    items, potencia = ReposicionConjuntaPipeline.resolver(
+        grupo, D, C1, s, S[grupo], potencia_dos=True
+    )
+    k_potencia = items["k"].to_numpy()
+    assert (k_potencia & (k_potencia - 1) == 0).all()
+
+    # Costo óptimo para cada vector k entero: √(2(S + Σs/k) · ΣkDC₁)
+    K = np.array(list(itertools.product(range(1, 21), repeat=n)), dtype=float)
+    for g in range(G):
+        m = grupo == g
+        costos = np.sqrt(2 * (S[g] + (s[m] / K).sum(1)) * (K * D[m] * C1[m]).sum(1))
+        optimo = costos.min()
+        assert K[costos.argmin()].max() < 20  # la grilla contiene al óptimo
+        assert rand.loc[g, "costo_total"] == pytest.approx(optimo, rel=1e-9)
+        assert potencia.loc[g, "costo_total"] >= rand.loc[g, "costo_total"]
+        assert potencia.loc[g, "costo_total"] <= 1.06 * optimo
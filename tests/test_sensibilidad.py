@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from src.pipelines.sensibilidad import SensibilidadPipeline
+
+
+def _elasticidad_numerica(sup, campo, eje):
+    """Pendiente log-log por diferencias centradas sobre una grilla geométrica"""
+    dim = list(sup.ejes).index(eje)
+    return np.gradient(np.log(sup[campo]), np.log(sup.ejes[eje]), axis=dim)
+
+
+def test_elasticidad_Q_respecto_de_D():
+    D = np.geomspace(100, 10_000, 201)
+    sup = SensibilidadPipeline.evaluar(
+        "clasico", ejes={"D": D, "C1": np.geomspace(1, 5, 11)}, C3=50, C4=10
+    )
+    assert sup.forma == (201, 11) and sup.valido.all()
+    np.testing.assert_allclose(sup.elasticidad_Q["D"], 0.5)
+    np.testing.assert_allclose(_elasticidad_numerica(sup, "Q_optimo", "D"), 0.5)
+    np.testing.assert_allclose(
+        _elasticidad_numerica(sup, "Q_optimo", "C1")[:, 1:-1], -0.5
+    )
+    np.testing.assert_allclose(
+        _elasticidad_numerica(sup, "costo_total", "D")[1:-1],
+        sup.elasticidad_costo["D"][1:-1],
+        rtol=1e-3,
+    )
+
+    sup = SensibilidadPipeline.evaluar(
+        "faltantes", ejes={"C2": np.geomspace(1, 100, 301)}, D=1000, C1=2, C3=50
+    )
+    assert sup.elasticidad_Q["C2"][150] == pytest.approx(
+        _elasticidad_numerica(sup, "Q_optimo", "C2")[150], rel=1e-3
+    )
@@ -0,0 +1,118 @@
+import numpy as np
+import pytest
+
+from src.pipelines.simulacion import (
+    OptimizadorPoliticasPipeline,
+    SimuladorInventarioPipeline,
+)
+
+
+def test_optimizar_costo_fuera_de_muestra():
+    rng = np.random.default_rng(0)
+    historia = rng.poisson([[5.0], [20.0]], (2, 200)).astype(float)
+    busqueda, validacion = np.random.SeedSequence(7).spawn(2)
+    demanda = OptimizadorPoliticasPipeline.escenarios_bootstrap(
+        historia, 30, 365, seed=busqueda
+    )
+    nuevas = OptimizadorPoliticasPipeline.escenarios_bootstrap(
+        historia, 30, 365, seed=validacion
+    )
+    costos = dict(C1=2.0, C3=50.0, C2=200.0, lead_time=3, n_jobs=1)
+    res = OptimizadorPoliticasPipeline.optimizar(demanda, validacion=nuevas, **costos)
+
+    # El costo reportado es el del ganador simulado sobre las trayectorias nuevas
+    for i, fila in res.iterrows():
+        directo = SimuladorInventarioPipeline.simular(
+            nuevas[i], s=fila["s"], S=fila["S"], lead_time=3, C1=2.0, C3=50.0, C2=200.0
+        )["costo_total_anual"]
+        assert fila["costo_anual"] == pytest.approx(directo.mean())
+        assert fila["ic_inf"] < fila["costo_anual"] < fila["ic_sup"]
+
+    # Por defecto se valida con un hijo del SeedSequence: reproducible
+    a = OptimizadorPoliticasPipeline.optimizar(demanda, seed=3, **costos)
+    b = OptimizadorPoliticasPipeline.optimizar(demanda, seed=3, **costos)
+    assert a.equals(b)
+    assert (a["candidato"] == res["candidato"]).all()
+
+    # Óptimo interior de la grilla y óptimo en su borde
+    grilla = np.array([[s, s + q] for s in (0.0, 15.0, 40.0) for q in (150, 300, 600)])
+    res = OptimizadorPoliticasPipeline.optimizar(
+        demanda[:1], candidatos=grilla, seed=0, **costos
+    )
+    assert res.loc[0, "candidato"] == 4 and not res.loc[0, "borde"]
+    res = OptimizadorPoliticasPipeline.optimizar(
+        demanda[:1], candidatos=grilla[:3], seed=0, **costos
+    )
+    assert res.loc[0, "borde"]
+
+
+def _simular_ingenuo(d, s, Q, S, L, R, perdidas):
+    """Referencia: un SKU, día por día, con la lista de pedidos pendientes"""
+    neto = S if S is not None else s + Q
+    pendientes, r = [], dict.fromkeys(
+        ("mantener", "faltante", "perdida", "pedidos", "servido"), 0.0
+    )
+    for t, dt in enumerate(d):
+        neto += sum(q for dia, q in pendientes if dia == t)
+        pendientes = [(dia, q) for dia, q in pendientes if dia != t]
+        r["servido"] += min(max(neto, 0), dt)
+        neto -= dt
+        if perdidas and neto < 0:
+            r["perdida"] -= neto
+            neto = 0.0
+        posicion = neto + sum(q for _, q in pendientes)
+        if posicion <= s and t % R == 0:
+            q = S - posicion if S is not None else ((s - posicion) // Q + 1) * Q
+            r["pedidos"] += 1
+            if L == 0:
+                neto += q
+            else:
+                pendientes.append((t + L, q))
+        r["mantener"] += max(neto, 0)
+        r["faltante"] += max(-neto, 0)
+    return r, neto
+
+
+@pytest.mark.parametrize("perdidas", [False, True])
+@pytest.mark.parametrize("politica", ["sQ", "sS"])
+def test_simular_contra_bucle_ingenuo(perdidas, politica):
+    rng = np.random.default_rng(1)
+    m, T = 12, 150
+    demanda = rng.poisson(rng.uniform(1, 20, (m, 1)), (m, T)).astype(float)
+    # Lead times mayores y menores que el período de revisión, y cero
+    L = np.array([0, 2, 9, 15] * 3)
+    R = np.repeat([1, 3, 7], 4)
+    s = rng.uniform(0, 80, m).round()
+    Q = rng.uniform(20, 150, m).round()
+    S = s + Q if politica == "sS" else None
+    res = SimuladorInventarioPipeline.simular(
+        demanda,
+        s=s,
+        Q=None if S is not None else Q,
+        S=S,
+        lead_time=L,
+        R=R,
+        C1=3.0,
+        C3=40.0,
+        C2=10.0,
+        dias=365,
+        ventas_perdidas=perdidas,
+    )
+    for i in range(m):
+        r, neto = _simular_ingenuo(
+            demanda[i], s[i], Q[i], None if S is None else S[i], L[i], R[i], perdidas
+        )
+        fila = res.iloc[i]
+        assert fila["pedidos"] == r["pedidos"]
+        assert fila["inventario_final"] == pytest.approx(neto)
+        assert fila["inventario_medio"] == pytest.approx(r["mantener"] / T)
+        assert fila["backorder_medio"] == pytest.approx(r["faltante"] / T)
+        assert fila["ventas_perdidas"] == pytest.approx(r["perdida"])
+        assert fila["fill_rate"] == pytest.approx(r["servido"] / demanda[i].sum())
+        costo = r["mantener"] * 3 / 365 + r["pedidos"] * 40
+        costo += r["faltante"] * 10 / 365 + r["perdida"] * 10
+        assert fila["costo_total"] == pytest.approx(costo)
+    if perdidas:
+        assert (res["backorder_medio"] == 0).all() and res["ventas_perdidas"].any()
+    else:
+        assert (res["ventas_perdidas"] == 0).all() and res["backorder_medio"].any()